@@ -1,446 +1,219 @@
+import datetime
+import functools
+
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-import unicodedata
+import numpy as np
+
+from pipeline import (
+    BRAND_TO_SHEET,
+    EXPORT_FAST_PATH_ROWS,
+    EXPORT_FORMATS,
+    FLOW_DELTA_DAYS,
+    FLOW_HISTORY_DIR,
+    FLOW_TYPES,
+    NULL_TIMER,
+    OVERVIEW_TOTAL,
+    PREPARED_DIR,
+    SHEET_CACHE_DIR,
+    SHEET_CACHE_TTL_SECONDS,
+    SHEET_FETCH_WORKERS,
+    TABLE_PAGE_SIZE,
+    build_dashboard_data,
+    build_partition_index,
+    concat_base_shards,
+    current_prepared_version,
+    detail_table,
+    enable_stage_logging,
+    export_table,
+    flow_baseline_day,
+    flow_count_trend,
+    flow_counts_from_rollup,
+    flow_deltas,
+    flow_overview,
+    flow_sort_order,
+    get_gsheet_client,
+    load_sheet_as_dataframe,
+    load_sheet_columns_as_dataframe,
+    load_sheets_concurrently,
+    merge_brand_sheets_into_prepared,
+    order_by_rank,
+    overview_matrix,
+    parse_base_shards,
+    parse_header_row,
+    prepare_items_df,
+    projected_sheet_cache_dir,
+    read_flow_count_history,
+    read_flow_flags,
+    read_prepared_snapshot,
+    record_flow_snapshot,
+    rollup_styles,
+    season_options_from_index,
+    select_partition_rows,
+    spreadsheet_ids_from_config,
+    SheetStore,
+    StageTimer,
+)
 
 st.set_page_config(page_title="(브랜드 상세) 대시보드", layout="wide")
 
-# Google Sheets 연동
-def get_gsheet_client(credentials_dict):
-    if credentials_dict is None:
-        return None
-    import gspread
-    from google.oauth2.service_account import Credentials
-    scope = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds = Credentials.from_service_account_info(
-        credentials_dict, scopes=scope
-    )
-    return gspread.authorize(creds)
 
+def _secrets_credentials():
+    try:
+        if "gcp_service_account" in st.secrets:
+            return dict(st.secrets["gcp_service_account"])
+        if "google_service_account" in st.secrets:
+            return dict(st.secrets["google_service_account"])
+    except Exception:
+        pass
+    return None
 
-def _normalize_spreadsheet_id(spreadsheet_id_or_url):
-    import re
-
-    if spreadsheet_id_or_url is None:
-        return ""
-    s = str(spreadsheet_id_or_url).strip()
-    if not s:
-        return ""
 
-    m = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", s)
-    if m:
-        return m.group(1)
+def _sheet_cache_dir():
+    try:
+        return str(st.secrets.get("SHEET_CACHE_DIR", SHEET_CACHE_DIR) or "").strip()
+    except Exception:
+        return SHEET_CACHE_DIR
 
-    m = re.search(r"(?:^|[?&])key=([a-zA-Z0-9-_]+)", s)
-    if m:
-        return m.group(1)
 
-    return s
+def _shot_date_column_setting():
+    return (st.secrets.get("SHOT_DATE_COLUMN") or "").strip() or None
 
-def open_or_create_spreadsheet(client, spreadsheet_id=None, spreadsheet_title=None, create_if_missing=False):
 
-    import gspread
-    sid = _normalize_spreadsheet_id(spreadsheet_id)
-    if sid:
-        return client.open_by_key(sid)
+def _flow_history_dir():
+    try:
+        return str(st.secrets.get("FLOW_HISTORY_DIR", FLOW_HISTORY_DIR) or "").strip()
+    except Exception:
+        return FLOW_HISTORY_DIR
 
-    title = (spreadsheet_title or "").strip() if spreadsheet_title else ""
-    if not title:
-        raise ValueError("스프레드시트 ID/URL 또는 제목(spreadsheet_title)이 필요합니다.")
 
-    try:
-        return client.open(title)
-    except gspread.exceptions.SpreadsheetNotFound:
-        if not create_if_missing:
-            raise
-        return client.create(title)
+@st.cache_data(max_entries=4)
+def _cached_flow_flags(history_dir, day):
+    """기준일 스타일별 흐름 플래그 (날짜별 파일은 기록 후 바뀌지 않으므로 TTL 없음)."""
+    return read_flow_flags(history_dir, day)
 
 
 @st.cache_data(ttl=600)
-def _cached_load_sheet(spreadsheet_id: str, sheet_name: str, header_row: int):
-    if not spreadsheet_id or not str(spreadsheet_id).strip():
-        return None
-    try:
-        if "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-        elif "google_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["google_service_account"])
-        else:
-            return None
-    except Exception:
-        return None
-    client = get_gsheet_client(creds_dict)
-    if client is None:
-        return None
-    return load_sheet_as_dataframe(
-        client,
-        spreadsheet_id,
-        sheet_name=sheet_name or None,
-        header_row=header_row,
-    )
+def _cached_flow_count_history(history_dir):
+    return read_flow_count_history(history_dir)
 
 
-def load_sheet_as_dataframe(
-    client,
-    spreadsheet_id=None,
-    sheet_name=None,
-    header_row=0,
-    spreadsheet_title=None,
-    create_spreadsheet_if_missing=False,
-    create_worksheet_if_missing=False,
-):
-    try:
-        spreadsheet = open_or_create_spreadsheet(
-            client,
-            spreadsheet_id=spreadsheet_id,
-            spreadsheet_title=spreadsheet_title,
-            create_if_missing=create_spreadsheet_if_missing,
-        )
+@st.cache_resource(max_entries=len(BRAND_TO_SHEET) + 2)
+def _record_flow_history_once(history_dir, day, data_version, brands=None, _style_rollup=None):
+    return record_flow_snapshot(history_dir, _style_rollup, day=day, brands=brands)
 
-        # 워크시트는 반드시 "스프레드시트를 연 뒤"에 가져옵니다.
-        if sheet_name and str(sheet_name).strip():
-            try:
-                worksheet = spreadsheet.worksheet(str(sheet_name).strip())
-            except Exception as e:
-                # 없는 워크시트를 요청한 경우(옵션) 생성
-                if create_worksheet_if_missing:
-                    worksheet = spreadsheet.add_worksheet(title=str(sheet_name).strip(), rows=1000, cols=26)
-                else:
-                    raise e
-        else:
-            worksheet = spreadsheet.sheet1
-
-        rows = worksheet.get_all_values()
-        if not rows:
-            return pd.DataFrame()
-        # 자동 헤더 감지: 1행에 '리터칭'이 없으면 2행·3행 시도
-        if header_row == -1:
-            header_row = 0
-            for try_row in range(min(3, len(rows))):
-                try_headers = [str(h).strip() for h in rows[try_row]]
-                if any("리터칭" in str(h) for h in try_headers):
-                    header_row = try_row
-                    break
-        if len(rows) <= header_row:
-            return pd.DataFrame()
-        headers = [str(h).strip() for h in rows[header_row]]
-        data_rows = rows[header_row + 1:]
-        return pd.DataFrame(data_rows, columns=headers)
-    except Exception as e:
-        st.error(f"시트 읽기 오류: {e}")
-        return None
 
-# 스타일코드 앞 2자리 → 브랜드 한글명
-BRAND_CODE_MAP = {
-    "sp": "스파오",
-    "rm": "로엠",
-    "mi": "미쏘",
-    "wh": "후아유",
-    "nb": "뉴발란스",
-    "eb": "에블린",
-    "hp": "슈펜",
-    "cv": "클라비스",
-    "nk": "뉴발란스키즈"
-}
-# 브랜드별 촬영·등록 여부 시트 (해당 시트에서만 읽어서 merge)
-BRAND_TO_SHEET = {
-    "스파오": "SP",
-    "미쏘": "MI",
-    "클라비스": "CV",
-    "로엠": "RM",
-    "후아유": "WH",
-    "슈펜": "HP",  
-    "에블린": "EB", 
-    "뉴발란스키즈": "NK",
-    "뉴발란스": "NB"
-}
-
-def _normalize_style_code_for_merge(val):
-    if pd.isna(val):
-        return ""
-    s = str(val).strip()
-    if not s or s.lower() == "nan":
-        return ""
-    return "".join(s.split())
-
-
-def brand_from_style_code(style_code):
-    """스타일코드 앞 2자리로 브랜드명 반환 (소문자로 매핑)"""
-    if pd.isna(style_code) or not str(style_code).strip():
-        return ""
-    code = str(style_code).strip()[:2].lower()
-    return BRAND_CODE_MAP.get(code, code.upper())
-
-# 스타일코드 5번째 자리 → 연도, 6번째 자리 → 시즌
-STYLE_CODE_SEASON_TO_YEAR = {
-    "G": "2026",
-    "F": "2025",
-    "H": "2027",
-}
-
-def year_from_style_code(style_code, brand=None):
-    """스타일코드 미쏘만 6번째 자리가 연도, 그 외 브랜드는 5번째 자리가 연도."""
-    if pd.isna(style_code) or not str(style_code).strip():
-        return ""
-    s = str(style_code).strip()
-    if brand == "미쏘":
-        if len(s) < 6:
-            return ""
-        year_char = s[5].upper()
-    else:
-        if len(s) < 5:
-            return ""
-        year_char = s[4].upper()
-    return STYLE_CODE_SEASON_TO_YEAR.get(year_char, "")
-
-
-def year_season_from_style_code(style_code, brand=None):
-    """스타일코드에서 연도·시즌 자리로 '20261' 형태 반환. 미쏘만 6번째=연도·7번째=시즌, 그 외 5번째=연도·6번째=시즌."""
-    if pd.isna(style_code) or not str(style_code).strip():
-        return "", ""
-    s = str(style_code).strip()
-    if brand == "미쏘":
-        if len(s) < 7:
-            return "", ""
-        y = year_from_style_code(style_code, "미쏘")
-        if not y:
-            return "", ""
-        season_digit = s[6]
+def _record_flow_history(data_version, style_rollup, brands=None):
+    """오늘자 흐름 이력 기록 (같은 날은 덮어씀). 데이터 버전·날짜(지연 로딩은 브랜드)마다 한 번만 쓰고,
+    캐시를 끈 경우(data_version None)는 매 실행마다 시트를 다시 읽으므로 기록도 매번."""
+    history_dir = _flow_history_dir()
+    if not history_dir:
+        return
+    day = datetime.date.today().isoformat()
+    if data_version is None:
+        record_flow_snapshot(history_dir, style_rollup, day=day, brands=brands)
     else:
-        if len(s) < 6:
-            return "", ""
-        y = year_from_style_code(style_code, brand)
-        if not y:
-            return "", ""
-        season_digit = s[5]
-    if not season_digit.isdigit():
-        return "", ""
-    ys = y + season_digit
-    return ys, f"{ys} 시즌 상품"
-
-# 시트 컬럼명 → 앱 필수 컬럼명 매핑 (한글/다른 표기 지원)
-COLUMN_ALIASES = {
-    "브랜드": "brand",
-    "연도시즌": "yearSeason",
-    "연도·시즌": "yearSeason",
-    "연도 시즌": "yearSeason",
-    "시즌(Now)": "yearSeason",
-    "스타일코드": "styleCode",
-    "스타일 코드": "styleCode",
-    "스타일코드(Now)": "styleCode",
-    "상품명": "productName",
-    "컬러코드": "colorCode",
-    "색상코드": "colorCode",
-    "컬러 코드": "colorCode",
-    "컬러명": "colorName",
-    "색상": "colorName",
-    "컬러 명": "colorName",
-    "칼라(Now)": "colorName",
-    "사이즈코드": "sizeCode",
-    "사이즈 코드": "sizeCode",
-    "입고수량": "inboundQty",
-    "출고수량": "outboundQty",
-    "재고수량": "stockQty",
-    "판매수량": "salesQty",
-    "누적입고량(물류+입고조정+브랜드간)": "inboundQty",
-    "출고량[출고-반품](매장+고객+샘플+브랜드간)": "outboundQty",
-    "누적 판매량": "salesQty",
-    "판매재고량(입고량-누판량)": "stockQty",
-    "리터칭 완료일": "isShot",
-    "리터칭완료일": "isShot",
-    "업로드완료일": "isShot",
-    "공홈등록일": "isRegistered",
-    "공홈 등록일": "isRegistered",
-}
-
-def ensure_year_season_from_columns(df):
-    """년도(Now) + 시즌(Now) → yearSeason 조합"""
-    if "yearSeason" in df.columns:
-        return df
-    if "년도(Now)" in df.columns and "시즌(Now)" in df.columns:
-        df = df.copy()
-        df["yearSeason"] = df["년도(Now)"].astype(str) + df["시즌(Now)"].astype(str)
-    return df
+        _record_flow_history_once(history_dir, day, data_version, brands, _style_rollup=style_rollup)
+
+
+@st.cache_resource
+def _shared_gsheet_client():
+    """프로세스 전체에서 하나만 쓰는 인증된 클라이언트 (토큰·keep-alive 연결 재사용). 인증 정보가 없으면 None."""
+    return get_gsheet_client(_secrets_credentials())
+
+
+# 시트 저장소 종류: 전체 셀 / 브랜드 시트에서 병합에 쓰는 컬럼만
+FULL_SHEET = "full"
+BRAND_COLUMNS = "brand_columns"
+
+
+@st.cache_resource
+def _sheet_store(kind=FULL_SHEET, preferred_shot_date_col=None):
+    """프로세스 전체에서 공유하는 시트 저장소: 키별 single-flight 로딩 + 만료 시 이전 값을 주면서 백그라운드 갱신.
+    kind=BRAND_COLUMNS면 머릿글로 찾은 스타일코드·촬영일·등록일 컬럼만 읽고, 고른 촬영일 컬럼이
+    preferred_shot_date_col에 따라 달라지므로 저장소·디스크 스냅샷을 설정값마다 따로 둠."""
+    cache_dir = _sheet_cache_dir()
+    loader = None
+    if kind == BRAND_COLUMNS:
+        loader = functools.partial(load_sheet_columns_as_dataframe, preferred_shot_date_col=preferred_shot_date_col)
+        cache_dir = projected_sheet_cache_dir(cache_dir, preferred_shot_date_col)
+    return SheetStore(
+        _shared_gsheet_client,
+        cache_dir=cache_dir,
+        ttl=SHEET_CACHE_TTL_SECONDS,
+        loader=loader,
+    )
 
-def apply_column_aliases(df):
-    """컬럼명 앞뒤 공백 제거 후 알려진 별칭으로 매핑"""
-    df = df.copy()
-    df.columns = [str(c).strip() for c in df.columns]
-    df = ensure_year_season_from_columns(df)
-    rename = {}
-    for col in list(df.columns):
-        if col in COLUMN_ALIASES:
-            target = COLUMN_ALIASES[col]
-            # 이미 있는 컬럼으로 덮어쓰지 않음 (예: yearSeason은 년도+시즌으로 이미 채움)
-            if target not in df.columns or col == target:
-                rename[col] = target
-    return df.rename(columns=rename) if rename else df
-
-def fill_missing_required_columns(df, required_columns):
-    """없는 필수 컬럼을 기본값으로 채움 (시트 구조가 다를 때 대시보드만 동작하도록)"""
-    df = df.copy()
-    for col in required_columns:
-        if col not in df.columns:
-            if col in ("isShot", "isRegistered", "isOnSale"):
-                df[col] = 0
-            elif col in ("inboundQty", "outboundQty", "stockQty", "salesQty"):
-                df[col] = 0
-            else:
-                df[col] = ""
-    return df
 
+def _store(kind=FULL_SHEET):
+    return _sheet_store(kind, _shot_date_column_setting() if kind == BRAND_COLUMNS else None)
 
-# 단계상태 판정 (단일 컬럼, flow와 무관)
-# - 가장 앞 단계에서 멈춘 곳 하나만 표시
 
-def compute_status(row):
-    if row["inboundQty"] == 0:
-        return "미입고"
-    if row["outboundQty"] == 0:
-        return "미출고"
-    if row["__shot_done"] == 0:
-        return "미촬영"
-    if row["isRegistered"] == 0:
-        return "미등록"
-    return "판매개시"
+def _cached_load_sheet(spreadsheet_id: str, sheet_name: str, header_row: int, _timer=NULL_TIMER, kind=FULL_SHEET):
+    if not spreadsheet_id or not str(spreadsheet_id).strip():
+        return None
+    if _secrets_credentials() is None:
+        return None
+    # 실제로 읽은 경우(miss)에만 _timer에 표시됨
+    return _store(kind).get(spreadsheet_id, sheet_name, header_row, on_error=st.error, timer=_timer)
 
 
-# 기본 화면 정렬 순서
-BASE_SORT_ORDER = {
-    "미입고": 0,
-    "미출고": 1,
-    "미촬영": 2,
-    "미등록": 3,
-    "판매개시": 4,
-}
+def _timed_load_sheet(spreadsheet_id, sheet_name, header_row, timer=NULL_TIMER, kind=FULL_SHEET):
+    """_cached_load_sheet 호출을 계측 (시간·행 수·메모리 캐시 hit/miss)."""
+    with timer.stage("fetch", sheet=str(spreadsheet_id)[-6:], kind=kind) as rec:
+        df = _cached_load_sheet(spreadsheet_id, sheet_name, header_row, _timer=timer, kind=kind)
+        rec["rows"] = 0 if df is None else len(df)
+        rec["cache"] = "miss" if timer.consume_miss(("load_sheet", spreadsheet_id, sheet_name, header_row)) else "hit"
+    return df
 
-# 버튼 클릭 시: 해당 단계가 안 된 스타일을 제일 위로
-FLOW_SORT_ORDER = {
-    "입고": ["미입고", "미출고", "미촬영", "미등록", "판매개시"],
-    "출고": ["미출고", "미입고", "미촬영", "미등록", "판매개시"],
-    "촬영": ["미촬영", "미입고", "미출고", "미등록", "판매개시"],
-    "등록": ["미등록", "미입고", "미출고", "미촬영", "판매개시"],
-}
 
+def _script_ctx_initializer():
+    """작업 스레드에서도 st.error·캐시가 현재 세션에 붙도록 ScriptRunContext를 넘겨주는 initializer."""
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        add_script_run_ctx, ctx = None, None
 
-# 촬영 완료 판정: 리터칭완료일·업로드완료일 등 날짜 컬럼
+    def _init_worker():
+        if add_script_run_ctx is not None and ctx is not None:
+            import threading
+            add_script_run_ctx(threading.current_thread(), ctx)
 
-# 규칙: "리터칭완료일" 또는 "업로드완료일" 열에 날짜 값이 있으면 그 행은 촬영 O. (클라비스는 업로드완료일 사용)
+    return _init_worker
 
-def _normalize_col_name(name):
-    """컬럼명 비교용: 앞뒤 공백·제어문자 제거, 유니코드 정규화, 공백 통일."""
-    if name is None or not isinstance(name, str):
-        return ""
-    try:
-        s = unicodedata.normalize("NFKC", str(name))
-    except Exception:
-        s = str(name)
-    s = s.strip()
-    s = "".join(c for c in s if ord(c) >= 32 or c in "\t\n\r")
-    return s.replace(" ", "").replace("\u3000", "")
-
-def _find_photo_date_column(df, preferred_name=None):
-    """촬영완료를 판정할 컬럼. 리터칭완료일·업로드완료일 등."""
-    if preferred_name and str(preferred_name).strip():
-        name = str(preferred_name).strip()
-        for c in df.columns:
-            if str(c).strip() == name:
-                return c
-        name_norm = _normalize_col_name(name)
-        for c in df.columns:
-            if _normalize_col_name(c) == name_norm:
-                return c
-    # 1순위: 이름에 "리터칭"이 포함된 컬럼 (공백/특수문자 무관, 가장 관대하게)
-    for c in df.columns:
-        raw = str(c)
-        if "리터칭" in raw or "retouch" in raw.lower():
-            return c
-    # 2순위: 머릿글 "리터칭완료일" 정확히 (공백/제어문자만 정규화)
-    for c in df.columns:
-        if _normalize_col_name(c) == "리터칭완료일":
-            return c
-    return None
 
+def _load_sheets_concurrently(jobs, sheet_name, header_row, max_workers=SHEET_FETCH_WORKERS, timer=NULL_TIMER, kind=FULL_SHEET):
+    """(키, spreadsheet_id) 목록을 캐시 경유로 동시에 읽어 {키: DataFrame|None} 반환."""
+    return load_sheets_concurrently(
+        jobs,
+        lambda sid: _timed_load_sheet(sid, sheet_name, header_row, timer, kind=kind),
+        max_workers=max_workers,
+        initializer=_script_ctx_initializer(),
+    )
 
-def _find_registration_date_column(df):
-    """등록 여부 판정용 날짜 컬럼. 공홈등록일 우선."""
-    for c in df.columns:
-        raw = str(c).strip()
-        n = _normalize_col_name(c)
-        if "공홈등록" in n or "공홈 등록" in n or "공홈등록일" in n:
-            return c
-    return None
 
+def _warm_sheets(sources, max_workers=SHEET_FETCH_WORKERS, timer=NULL_TIMER):
+    """(spreadsheet_id, 워크시트, header_row, kind) 목록을 동시에 읽어 저장소에 올려 두고 시트별 버전 토큰 튜플 반환
+    (읽지 못한 시트는 ""). 가공 결과 캐시 키를 만들기 전에 호출해 차가운 캐시에서도 시트를 한 번에 받음."""
+    frames = load_sheets_concurrently(
+        list(enumerate(sources)),
+        lambda source: _timed_load_sheet(*source[:3], timer=timer, kind=source[3]),
+        max_workers=max_workers,
+        initializer=_script_ctx_initializer(),
+    )
+    return tuple(
+        _store(kind).version(sid, sheet_name, header_row) if frames[i] is not None else ""
+        for i, (sid, sheet_name, header_row, kind) in enumerate(sources)
+    )
 
-def _parse_date_series(ser):
-    out = pd.to_datetime(ser, errors="coerce")
-    # 파싱 실패한 셀: 앞뒤 공백 제거 후 재시도
-    still_na = out.isna()
-    if still_na.any():
-        try:
-            cleaned = ser.astype(str).str.strip()
-            out2 = pd.to_datetime(cleaned, errors="coerce")
-            out = out.fillna(out2)
-        except Exception:
-            pass
-    # "2025. 1. 15"처럼 점 앞뒤 공백 제거 후 재시도
-    still_na = out.isna()
-    if still_na.any():
-        try:
-            s = ser.astype(str).str.strip()
-            s = s.str.replace(r"\s*\.\s*", ".", regex=True).str.replace(r"\s*-\s*", "-", regex=True)
-            out3 = pd.to_datetime(s, errors="coerce")
-            out = out.fillna(out3)
-        except Exception:
-            pass
-    # 구글 시트/엑셀 날짜 일련번호(문자열 "45324" 등)
-    if out.isna().any():
-        numeric = pd.to_numeric(ser, errors="coerce")
-        valid_num = numeric.notna() & (numeric > 10000) & (numeric < 1000000)
-        if valid_num.any():
-            fixed = pd.to_datetime(numeric[valid_num], unit="D", origin="1899-12-30")
-            out = out.fillna(fixed)
-    return out
-
-def _looks_like_date_value(val):
-    """셀 값이 날짜처럼 보이면 True (파싱 실패해도 '값 있음'으로 촬영 완료 처리용)."""
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return False
-    s = str(val).strip()
-    if not s or s in ("-", ".", "미정", "n/a", "N/A", "—"):
-        return False
-    # 숫자 4자리 이상 + 구분자(-./) 있으면 날짜로 간주
-    if any(sep in s for sep in ("-", ".", "/")) and any(c.isdigit() for c in s):
-        return True
-    # 숫자만 있는 경우(엑셀 시리얼)
-    if s.isdigit() and 10000 <= int(s) <= 1000000:
-        return True
-    return False
-
-
-def compute_shot_done_series(df, preferred_date_column=None):
-    """촬영 완료 여부(0/1) 시리즈 생성.
-    리터칭완료일에 값(날짜)이 있으면 그 행은 촬영 완료(O).
-    리터칭완료일 컬럼이 없으면 촬영일자/포토촬영일 등 다른 날짜 컬럼, 없으면 isShot(0/1) 폴백.
-    """
-    date_col = _find_photo_date_column(df, preferred_name=preferred_date_column)
-    if date_col is not None and date_col in df.columns:
-        ser = _parse_date_series(df[date_col])
-        done = ser.notna().astype(int)
-        # 파싱은 실패했지만 값이 날짜 형태인 경우(공백/형식 이슈) O 처리
-        if (done == 0).any():
-            raw = df[date_col].astype(str).str.strip()
-            fallback = raw.apply(_looks_like_date_value).astype(int)
-            done = done.where(done == 1, fallback)
-        return done
-
-    if "isShot" in df.columns:
-        return (pd.to_numeric(df["isShot"], errors="coerce").fillna(0).astype(int) == 1).astype(int)
-
-    return pd.Series([0] * len(df), index=df.index, dtype="int64")
+
+def _load_base_shards(load_fn, shards, max_workers=SHEET_FETCH_WORKERS):
+    """BASE 샤드들을 load_fn(shard)로 동시에 읽어 하나의 DataFrame으로 이어 붙임 (하나라도 실패하면 None)."""
+    frames = load_sheets_concurrently(
+        list(enumerate(shards)), load_fn, max_workers=max_workers, initializer=_script_ctx_initializer()
+    )
+    return concat_base_shards([frames[i] for i in range(len(shards))])
 
 
 # 제목
@@ -449,44 +222,22 @@ st.title("브랜드 상품 흐름 대시보드")
 
 
 # Google Sheets 연결 
-SPREADSHEET_OPTIONS = {
-    "BASE_SPREADSHEET_ID": "BASE",
-    "SP_SPREADSHEET_ID": "SP",
-    "MI_SPREADSHEET_ID": "MI",
-    "CV_SPREADSHEET_ID": "CV",
-    "WH_SPREADSHEET_ID": "WH",
-    "RM_SPREADSHEET_ID": "RM",
-    "EB_SPREADSHEET_ID": "EB",
-    "HP_SPREADSHEET_ID": "HP",
-    "NK_SPREADSHEET_ID": "NK"
-}
-
 def get_spreadsheet_ids_from_secrets():
-    ids = {}
-    for secret_key, label in SPREADSHEET_OPTIONS.items():
-        try:
-            val = st.secrets.get(secret_key, "")
-            if val and str(val).strip():
-                ids[label] = str(val).strip()
-        except Exception:
-            pass
-    return ids
-
-creds_dict = None
-try:
-    if "gcp_service_account" in st.secrets:
-        creds_dict = dict(st.secrets["gcp_service_account"])
-    elif "google_service_account" in st.secrets:
-        creds_dict = dict(st.secrets["google_service_account"])
-except Exception:
-    pass
-gs_client = get_gsheet_client(creds_dict) if creds_dict else None
+    return spreadsheet_ids_from_config(st.secrets)
+
+creds_dict = _secrets_credentials()
+gs_client = _shared_gsheet_client() if creds_dict else None
 
 spreadsheet_ids = get_spreadsheet_ids_from_secrets()
+# BASE를 여러 스프레드시트/워크시트로 나눠 둔 경우 (설정하면 BASE_SPREADSHEET_ID 대신 사용)
+base_shards = parse_base_shards(st.secrets.get("BASE_SHARDS"))
 spreadsheet_title = None
 create_spreadsheet_if_missing = False
 
-if not spreadsheet_ids:
+if base_shards:
+    selected_label = "BASE"
+    spreadsheet_id = base_shards[0][0]
+elif not spreadsheet_ids:
     # ID가 없으면(옵션) 제목으로 열기/생성할 수 있게 지원
     auto_create = str(st.secrets.get("AUTO_CREATE_SPREADSHEET", "")).strip().lower() in ("1", "true", "yes", "y")
     spreadsheet_title = str(st.secrets.get("SPREADSHEET_TITLE", "")).strip() or str(st.secrets.get("BASE_SPREADSHEET_TITLE", "")).strip()
@@ -501,177 +252,237 @@ else:
     selected_label = list(spreadsheet_ids.keys())[0]
     spreadsheet_id = spreadsheet_ids[selected_label]
 items_sheet_name = ""
-_header_raw = st.secrets.get("HEADER_ROW")
-if _header_raw is None or str(_header_raw).strip() == "":
-    header_row = 0  # 1행이 헤더 (0-based)
-elif str(_header_raw).strip().lower() in ("0", "auto", "자동"):
-    header_row = -1  # 1~3행 중 '리터칭' 포함된 행 자동 선택
-else:
-    header_row = int(_header_raw) - 1  # 1-based → 0-based
+header_row = parse_header_row(st.secrets.get("HEADER_ROW"))
 snapshots_sheet_name = ""
 
 if not gs_client:
     st.info("Streamlit Secrets에 **gcp_service_account** 또는 **google_service_account**를 설정해 주세요.")
     st.stop()
 
+# 단계별 계측: PIPELINE_TRACE=true면 JSON 로그, ?diag=<DIAGNOSTICS_TOKEN>이면 화면 하단 진단 패널까지 표시.
+# 둘 다 꺼져 있으면 NULL_TIMER(no-op)를 써서 비용이 거의 없음
+_diag_token = str(st.secrets.get("DIAGNOSTICS_TOKEN", "") or "").strip()
+show_diagnostics = bool(_diag_token) and st.query_params.get("diag") == _diag_token
+trace_enabled = show_diagnostics or str(st.secrets.get("PIPELINE_TRACE", "")).strip().lower() in ("1", "true", "yes", "y")
+timer = StageTimer() if trace_enabled else NULL_TIMER
+if trace_enabled:
+    enable_stage_logging()
+
+preferred_shot_date_col = _shot_date_column_setting()
+try:
+    fetch_workers = int(st.secrets.get("SHEET_FETCH_WORKERS", SHEET_FETCH_WORKERS))
+except Exception:
+    fetch_workers = SHEET_FETCH_WORKERS
+# 촬영·등록 여부 시트: (시트키, spreadsheet_id), 헤더 자동 감지(-1)일 때는 1행 헤더로 읽음
+brand_sources = tuple(
+    (sheet_key, str(spreadsheet_ids[sheet_key]).strip())
+    for sheet_key in BRAND_TO_SHEET.values()
+    if spreadsheet_ids.get(sheet_key)
+)
+brand_header_row = int(header_row) if header_row >= 0 else 0
+sheet_name_key = items_sheet_name.strip() if items_sheet_name else ""
+# 브랜드 시트는 기본적으로 병합에 쓰는 컬럼만 읽음 (BRAND_SHEET_PROJECTION=false면 전체 셀)
+brand_kind = (
+    FULL_SHEET
+    if str(st.secrets.get("BRAND_SHEET_PROJECTION", "")).strip().lower() in ("0", "false", "no", "n")
+    else BRAND_COLUMNS
+)
+
+
+@st.cache_resource(max_entries=4)
+def _cached_prepared_items(version_key, items_sources, brand_sources, brand_sheet_name, brand_header_row, preferred_shot_date_col, fetch_workers, brand_kind=FULL_SHEET, _timer=NULL_TIMER):
+    """원본 시트 버전(version_key)별로 가공 완료된 items_df를 한 번만 만들어 모든 세션·재실행이 공유.
+    items_sources는 BASE 샤드별 (spreadsheet_id, 워크시트, header_row).
+    반환된 DataFrame은 읽기 전용으로 사용 (필터 단계에서 복사본을 만듦)."""
+    _timer.note_miss(("prepared", version_key))
+    raw_df = _load_base_shards(
+        lambda source: _timed_load_sheet(*source, timer=_timer), items_sources, max_workers=fetch_workers
+    )
+    if raw_df is None or len(raw_df) == 0:
+        return {"items_df": raw_df}
+    brand_frames = _load_sheets_concurrently(
+        list(brand_sources), brand_sheet_name, brand_header_row, max_workers=fetch_workers, timer=_timer,
+        kind=brand_kind,
+    )
+    items_df, shot_date_column = prepare_items_df(raw_df, brand_frames, preferred_shot_date_col, timer=_timer)
+    return build_dashboard_data(items_df, shot_date_column, timer=_timer)
+
+
+@st.cache_resource(max_entries=4)
+def _cached_base_items(version_key, items_sources, preferred_shot_date_col, fetch_workers, _timer=NULL_TIMER):
+    """지연 로딩 모드: 브랜드 시트 없이 BASE만 가공 (브랜드·시즌 선택지와 브랜드별 행 위치용)."""
+    _timer.note_miss(("base_items", version_key))
+    raw_df = _load_base_shards(
+        lambda source: _timed_load_sheet(*source, timer=_timer), items_sources, max_workers=fetch_workers
+    )
+    if raw_df is None or len(raw_df) == 0:
+        return {"items_df": raw_df}
+    items_df, _ = prepare_items_df(raw_df, None, preferred_shot_date_col, timer=_timer)
+    return {"items_df": items_df, "partition_index": build_partition_index(items_df)}
+
+
+@st.cache_resource(max_entries=len(BRAND_TO_SHEET) + 1)
+def _cached_brand_items(version_key, brand, brand_sources, brand_sheet_name, brand_header_row, preferred_shot_date_col, brand_kind=FULL_SHEET, _base_items=None, _timer=NULL_TIMER):
+    """지연 로딩 모드: 선택한 브랜드 행에 촬영·등록 시트를 병합해 대시보드 데이터 생성.
+    선택한 브랜드 시트는 기다려서 읽고, 다른 브랜드 시트는 이미 읽어 둔 것만 사용 (다른 시트 보완용).
+    version_key에 BASE와 브랜드 시트들의 현재 버전이 들어 있어 _base_items는 캐시 키에서 뺌."""
+    _timer.note_miss(("brand_items", version_key, brand))
+    brand_sheet_key = BRAND_TO_SHEET.get(brand)
+    brand_frames = {}
+    for sheet_key, sid in brand_sources:
+        if sheet_key == brand_sheet_key:
+            brand_frames[sheet_key] = _timed_load_sheet(
+                sid, brand_sheet_name, brand_header_row, timer=_timer, kind=brand_kind
+            )
+        else:
+            # 아직 미리 읽는 중이면 None: 읽히면 version_key가 바뀌어 다시 병합
+            brand_frames[sheet_key] = _store(brand_kind).peek(sid, brand_sheet_name, brand_header_row)
+    positions = select_partition_rows(_base_items["partition_index"], brand)
+    with _timer.stage("prepare.brand_merge", rows=len(positions)):
+        items_df, shot_date_column = merge_brand_sheets_into_prepared(
+            _base_items["items_df"].take(positions), brand_frames, preferred_shot_date_col
+        )
+    return build_dashboard_data(items_df, shot_date_column, timer=_timer)
+
+
+@st.cache_resource(max_entries=2)
+def _cached_prepared_snapshot(prepared_dir, version, _timer=NULL_TIMER):
+    """배치 작업(precompute.py)이 만든 스냅샷을 버전별로 한 번만 읽어 인덱스까지 붙여 공유. 없으면 None."""
+    _timer.note_miss(("prepared_snapshot", version))
+    with _timer.stage("snapshot_read") as rec:
+        items_df, style_rollup, meta = read_prepared_snapshot(prepared_dir, version)
+        rec["rows"] = 0 if items_df is None else len(items_df)
+    if items_df is None or len(items_df) == 0:
+        return None
+    return build_dashboard_data(items_df, meta.get("shot_date_column"), timer=_timer, style_rollup=style_rollup)
+
+
+# 사전 계산 스냅샷이 있으면 시트를 읽지 않고 그것만 사용 (PREPARED_DIR secret, 기본 .prepared)
+prepared_dir = str(st.secrets.get("PREPARED_DIR", PREPARED_DIR) or "").strip()
+snapshot_version = current_prepared_version(prepared_dir)
+dashboard_data = None
+if snapshot_version:
+    with timer.stage("prepared_snapshot") as rec:
+        dashboard_data = _cached_prepared_snapshot(prepared_dir, snapshot_version, _timer=timer)
+        rec["cache"] = "miss" if timer.consume_miss(("prepared_snapshot", snapshot_version)) else "hit"
+
 use_cache = spreadsheet_id and not create_spreadsheet_if_missing and not spreadsheet_title and (header_row >= 0)
-if use_cache:
-    items_df = _cached_load_sheet(
-        str(spreadsheet_id).strip(),
-        items_sheet_name.strip() if items_sheet_name else "",
-        int(header_row),
+# 지연 로딩: 선택한 브랜드의 촬영·등록 시트만 먼저 읽어 병합하고 나머지는 백그라운드에서 미리 읽음
+lazy_brands = bool(use_cache) and dashboard_data is None and (
+    str(st.secrets.get("LAZY_BRAND_LOADING", "")).strip().lower() in ("1", "true", "yes", "y")
+)
+# BASE 시트(또는 샤드)별 (spreadsheet_id, 워크시트, header_row)
+items_sources = tuple(
+    (str(sid).strip(), sheet or sheet_name_key, int(header_row))
+    for sid, sheet in (base_shards or ((spreadsheet_id, sheet_name_key),))
+)
+if dashboard_data is not None:
+    use_cache = True
+    version_key = ("prepared", snapshot_version)
+elif lazy_brands:
+    version_key = _warm_sheets([source + (FULL_SHEET,) for source in items_sources], fetch_workers, timer)
+    with timer.stage("base_items") as rec:
+        dashboard_data = _cached_base_items(
+            version_key, items_sources, preferred_shot_date_col, fetch_workers, _timer=timer
+        )
+        rec["cache"] = "miss" if timer.consume_miss(("base_items", version_key)) else "hit"
+elif use_cache:
+    # 캐시 키: 원본 시트 버전 + HEADER_ROW·SHOT_DATE_COLUMN 설정 (BASE·브랜드 시트는 먼저 동시에 읽어 둠)
+    version_key = _warm_sheets(
+        [source + (FULL_SHEET,) for source in items_sources]
+        + [(sid, sheet_name_key, brand_header_row, brand_kind) for _, sid in brand_sources],
+        max_workers=fetch_workers,
+        timer=timer,
     )
+    with timer.stage("prepared_items") as rec:
+        dashboard_data = _cached_prepared_items(
+            version_key, items_sources, brand_sources, sheet_name_key, brand_header_row,
+            preferred_shot_date_col, fetch_workers, brand_kind, _timer=timer,
+        )
+        rec["cache"] = "miss" if timer.consume_miss(("prepared", version_key)) else "hit"
 else:
-    items_df = load_sheet_as_dataframe(
-        gs_client,
-        spreadsheet_id,
-        sheet_name=items_sheet_name if items_sheet_name.strip() else None,
-        header_row=header_row,
-        spreadsheet_title=spreadsheet_title,
-        create_spreadsheet_if_missing=create_spreadsheet_if_missing,
-    )
+    with timer.stage("fetch", sheet="BASE", cache="off") as rec:
+        if base_shards:
+            raw_items_df = _load_base_shards(
+                lambda shard: load_sheet_as_dataframe(
+                    gs_client, shard[0], sheet_name=shard[1] or None, header_row=header_row, on_error=st.error
+                ),
+                base_shards,
+                max_workers=fetch_workers,
+            )
+        else:
+            raw_items_df = load_sheet_as_dataframe(
+                gs_client,
+                spreadsheet_id,
+                sheet_name=items_sheet_name if items_sheet_name.strip() else None,
+                header_row=header_row,
+                spreadsheet_title=spreadsheet_title,
+                create_spreadsheet_if_missing=create_spreadsheet_if_missing,
+                on_error=st.error,
+            )
+        rec["rows"] = 0 if raw_items_df is None else len(raw_items_df)
+    dashboard_data = {"items_df": raw_items_df}
+    if raw_items_df is not None and len(raw_items_df) > 0:
+        brand_frames = _load_sheets_concurrently(
+            list(brand_sources), sheet_name_key, brand_header_row, max_workers=fetch_workers, timer=timer,
+            kind=brand_kind,
+        )
+        dashboard_data = build_dashboard_data(
+            *prepare_items_df(raw_items_df, brand_frames, preferred_shot_date_col, timer=timer), timer=timer
+        )
+items_df = dashboard_data["items_df"]
 if items_df is None:
     st.stop()
 if len(items_df) == 0:
     st.warning("시트에 데이터가 없습니다.")
     st.stop()
-
-# 한글/다른 컬럼명을 필수 컬럼명으로 매핑
-items_df = apply_column_aliases(items_df)
-
-# 브랜드: 스타일코드(Now) 앞 2자리
-if "styleCode" in items_df.columns:
-    items_df["brand"] = items_df["styleCode"].apply(brand_from_style_code)
-
-def _date_cell_to_01(ser):
-    s = ser.astype(str).str.strip()
-    num = pd.to_numeric(ser, errors="coerce")
-    no_date = s.isin(("", "0", "0.0", "-", ".")) | (num == 0)
-    parsed = pd.to_datetime(ser, errors="coerce")
-
-    excel_date = num.notna() & (num > 10000) & (num < 1000000)
-    if excel_date.any():
-        parsed = parsed.fillna(pd.to_datetime(num[excel_date], unit="D", origin="1899-12-30"))
-    return (parsed.notna() & ~no_date).astype(int)
-
-if "isShot" in items_df.columns:
-    items_df["isShot"] = _date_cell_to_01(items_df["isShot"])
-if "isRegistered" in items_df.columns:
-    items_df["isRegistered"] = _date_cell_to_01(items_df["isRegistered"])
-
-numeric_cols = [
-    "inboundQty", "outboundQty", "stockQty", "salesQty",
-    "isShot", "isRegistered", "isOnSale"
-]
-for col in numeric_cols:
-    if col in items_df.columns:
-        items_df[col] = pd.to_numeric(items_df[col], errors="coerce").fillna(0).astype(int)
-
-required_columns = [
-    "brand", "yearSeason", "styleCode", "productName",
-    "colorCode", "colorName", "sizeCode",
-    "inboundQty", "outboundQty", "stockQty", "salesQty",
-    "isShot", "isRegistered", "isOnSale"
-]
-
-missing = [col for col in required_columns if col not in items_df.columns]
-if missing:
-    items_df = fill_missing_required_columns(items_df, required_columns)
-
-
-# 촬영·등록 여부: 브랜드별 시트(SP/MI/CV/RM/WH)에서만 읽어서 merge. BASE에서는 사용 안 함.
-
-preferred_shot_date_col = (st.secrets.get("SHOT_DATE_COLUMN") or "").strip() or None
-shot_date_column = None
-items_df["__shot_done"] = 0
-if "isRegistered" not in items_df.columns:
-    items_df["isRegistered"] = 0
-
-if gs_client and spreadsheet_ids and "styleCode" in items_df.columns and "brand" in items_df.columns:
-    shot_reg_parts = []
-    for brand_name, sheet_key in BRAND_TO_SHEET.items():
-        sid = spreadsheet_ids.get(sheet_key)
-        if not sid:
-            continue
-        try:
-            _hr = int(header_row) if header_row >= 0 else 0
-            b_df = _cached_load_sheet(
-                str(sid).strip(),
-                items_sheet_name.strip() if items_sheet_name else "",
-                _hr,
-            )
-            if b_df is None or len(b_df) == 0:
-                continue
-            b_df.columns = [str(c).strip() for c in b_df.columns]
-            sc = "styleCode" if "styleCode" in b_df.columns else ("스타일코드" if "스타일코드" in b_df.columns else None)
-            if not sc:
-                continue
-            b_df["_styleCode"] = b_df[sc].apply(_normalize_style_code_for_merge)
-            b_df["brand"] = brand_name
-
-            shot_col = _find_photo_date_column(b_df, preferred_name=preferred_shot_date_col)
-            if shot_col and shot_col in b_df.columns:
-                # 모든 브랜드 동일 처리
-                b_df["__shot_done"] = _date_cell_to_01(b_df[shot_col])
-                if shot_date_column is None:
-                    shot_date_column = f"{sheet_key} 시트 · {shot_col}"
-            else:
-                b_df["__shot_done"] = 0
-                
-                if shot_date_column is None:
-                    shot_date_column = f"{sheet_key} 시트 · {shot_col}"
-
-            reg_col = _find_registration_date_column(b_df)
-            if reg_col and reg_col in b_df.columns:
-                b_df["isRegistered"] = _date_cell_to_01(b_df[reg_col])
-            else:
-                b_df["isRegistered"] = 0
-
-            by_style = b_df.groupby("_styleCode", dropna=False).agg({"__shot_done": "max", "isRegistered": "max"}).reset_index()
-            by_style["brand"] = brand_name
-            shot_reg_parts.append(by_style[["brand", "_styleCode", "__shot_done", "isRegistered"]])
-        except Exception:
-            continue
-
-    if shot_reg_parts:
-        shot_reg_df = pd.concat(shot_reg_parts, ignore_index=True)
-        items_df["_styleCode"] = items_df["styleCode"].apply(_normalize_style_code_for_merge)
-        merged = items_df[["_styleCode"]].merge(
-            shot_reg_df.drop(columns=["brand"]),
-            left_on="_styleCode",
-            right_on="_styleCode",
-            how="left",
-        )
-        items_df["__shot_done"] = merged["__shot_done"].fillna(0).astype(int)
-        items_df["isRegistered"] = merged["isRegistered"].fillna(0).astype(int)
-        items_df.drop(columns=["_styleCode"], inplace=True, errors="ignore")
-
+partition_index = dashboard_data["partition_index"]
+if not lazy_brands:
+    _record_flow_history(version_key if use_cache else None, dashboard_data["style_rollup"])
 
 
-# 단계상태 생성
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_flow_overview(data_version, year, _style_rollup):
+    """데이터 버전별 브랜드 × 시즌 흐름 개요 (전체 스타일 집계에서 groupby 한 번)."""
+    return flow_overview(_style_rollup, year)
 
-items_df["단계상태"] = items_df.apply(compute_status, axis=1)
 
-# 연도·시즌: 시즌은 항상 시즌(Now) 열에서 사용. 연도(_year)만 스타일코드에서 보조 사용.
-items_df["_year"] = items_df.apply(lambda row: year_from_style_code(row["styleCode"], row["brand"]), axis=1)
-empty_year = items_df["_year"] == ""
-if empty_year.any():
-    items_df.loc[empty_year, "_year"] = items_df.loc[empty_year, "yearSeason"].astype(str).str[:4]
+view_mode = st.radio("보기", ["브랜드 상세", "전체 브랜드 개요"], horizontal=True, key="view_mode")
+if view_mode == "전체 브랜드 개요":
+    year = "2026"  # 연도 고정
+    if "style_rollup" not in dashboard_data:
+        st.info("브랜드 지연 로딩(LAZY_BRAND_LOADING) 중에는 전체 브랜드 개요를 볼 수 없습니다.")
+        st.stop()
+    with timer.stage("overview"):
+        overview = _cached_flow_overview(
+            version_key if use_cache else id(items_df), year, dashboard_data["style_rollup"]
+        )
+    metric = st.radio(
+        "지표",
+        [OVERVIEW_TOTAL] + FLOW_TYPES,
+        format_func=lambda m: "발주 스타일 수" if m == OVERVIEW_TOTAL else f"{m} 스타일 수",
+        horizontal=True,
+        key="overview_metric",
+    )
+    if len(overview) == 0:
+        st.info(f"{year}년 데이터가 없습니다.")
+    else:
+        st.subheader(f"{year} 브랜드 × 시즌 ({metric})")
+        st.dataframe(overview_matrix(overview, metric), use_container_width=True)
+    st.stop()
 
 
 # 필터 영역
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    brand_options = sorted(items_df["brand"].unique())
+    brand_options = sorted(partition_index)
     default_brand_idx = brand_options.index("스파오") if "스파오" in brand_options else 0
     brand = st.selectbox("브랜드", brand_options, index=default_brand_idx)
 with col2:
     year = "2026"  # 연도 고정
     st.selectbox("연도", [year], key="year", disabled=True)
 with col3:
-    season_options = sorted(
-        items_df.loc[items_df["_year"] == year, "yearSeason"].unique()
-    )
+    season_options = season_options_from_index(partition_index, year)
     year_seasons = st.multiselect(
         "시즌",
         season_options,
@@ -684,53 +495,85 @@ with col4:
         placeholder="설정하신 필터 내에서 검색됩니다",
     )
 
-if year is not None and year_seasons:
-    filtered_df = items_df[
-        (items_df["brand"] == brand)
-        & (items_df["_year"] == year)
-        & (items_df["yearSeason"].isin(year_seasons))
-    ].copy()
-else:
-    filtered_df = items_df[(items_df["brand"] == brand)].copy()
-    if year is not None:
-        filtered_df = filtered_df[filtered_df["_year"] == year]
-    if year_seasons:
-        filtered_df = filtered_df[filtered_df["yearSeason"].isin(year_seasons)]
-
-if search:
-    filtered_df = filtered_df[
-        filtered_df["styleCode"].astype(str).str.contains(search, case=False, na=False)
-        | filtered_df["단계상태"].astype(str).str.contains(search, case=False, na=False)
-    ]
+if lazy_brands:
+    brand_sheet_key = BRAND_TO_SHEET.get(brand)
+    brand_source = next((source for source in brand_sources if source[0] == brand_sheet_key), None)
+    brand_version = (
+        _warm_sheets([(brand_source[1], sheet_name_key, brand_header_row, brand_kind)], timer=timer)[0]
+        if brand_source else ""
+    )
+    # 이미 읽어 둔 다른 브랜드 시트도 병합에 쓰므로 그 버전(아직 없으면 "")도 키에 넣음
+    other_versions = tuple(
+        _store(brand_kind).version(sid, sheet_name_key, brand_header_row)
+        for sheet_key, sid in brand_sources
+        if sheet_key != brand_sheet_key
+    )
+    version_key = version_key + (brand, brand_version, other_versions)
+    with timer.stage("brand_items", brand=brand) as rec:
+        dashboard_data = _cached_brand_items(
+            version_key, brand, brand_sources, sheet_name_key, brand_header_row, preferred_shot_date_col,
+            brand_kind, _base_items=dashboard_data, _timer=timer,
+        )
+        rec["cache"] = "miss" if timer.consume_miss(("brand_items", version_key, brand)) else "hit"
+    # 선택한 브랜드 행만 병합했으므로 오늘자 이력에서 그 브랜드 행만 바꿈
+    _record_flow_history(version_key, dashboard_data["style_rollup"], brands=(brand,))
+    # 다른 브랜드 시트는 백그라운드에서 미리 읽어 두어 브랜드를 바꿀 때 시트 다운로드를 기다리지 않게 함
+    _store(brand_kind).prefetch(
+        [(sid, sheet_name_key, brand_header_row) for sheet_key, sid in brand_sources if sheet_key != brand_sheet_key]
+    )
+    items_df = dashboard_data["items_df"]
+
+shot_date_column = dashboard_data["shot_date_column"]
+partition_index = dashboard_data["partition_index"]
+search_index = dashboard_data["search_index"]
+style_rollup = dashboard_data["style_rollup"]
+style_partition_index = dashboard_data["style_partition_index"]
+style_rollup_ids = dashboard_data["style_rollup_ids"]
+style_sort_ranks = dashboard_data["style_sort_ranks"]
+
+# 파티션 인덱스에서 선택한 브랜드·연도·시즌만 꺼냄 (take는 새 DataFrame 반환)
+# 검색: 스타일코드는 검색 인덱스로, 단계상태는 상태값 중 일치하는 것으로 판정 (부분 문자열, 대소문자 무시)
+status_col = items_df["단계상태"]
+matched_status = (
+    [status for status in status_col.cat.categories if search.lower() in str(status).lower()]
+    if search else []
+)
+
+with timer.stage("filter", search=bool(search)) as rec:
+    if matched_status:
+        # 단계상태 검색은 SKU 행 단위라 스타일 집계 전에 행을 거름 → 선택 범위만 다시 집계
+        row_positions = select_partition_rows(partition_index, brand, year, year_seasons)
+        keep = np.isin(search_index.style_ids[row_positions], search_index.search(search))
+        matched_codes = status_col.cat.categories.get_indexer(matched_status)
+        keep |= np.isin(status_col.cat.codes.to_numpy()[row_positions], matched_codes)
+        style_df = rollup_styles(items_df.take(row_positions[keep]))
+        style_positions = None
+    else:
+        # 미리 계산한 전체 브랜드 스타일 집계에서 선택 범위만 꺼냄
+        style_positions = select_partition_rows(style_partition_index, brand, year, year_seasons)
+        if search:
+            style_positions = style_positions[
+                np.isin(style_rollup_ids[style_positions], search_index.search(search))
+            ]
+        style_df = style_rollup.take(style_positions)
+    rec["rows"] = len(style_df)
 
 # 발주 스타일 수(고유 styleCode), 입고/출고 등은 스타일 수로 집계
-total_n = filtered_df["styleCode"].nunique()
+total_n = style_df["styleCode"].nunique()
 if total_n == 0:
     st.info("선택한 조건에 맞는 데이터가 없습니다.")
     st.stop()
 
-# 흐름 집계 카드 (스타일 수 기준: 해당 단계 1건이라도 있으면 스타일 포함)
-
-flow_types = ["입고", "출고", "촬영", "등록", "판매개시"]
-# 흐름별 조건: 해당 조건을 만족하는 행이 하나라도 있는 스타일 수
-_flow_conditions = {
-    "입고": (filtered_df["inboundQty"] > 0),
-    "출고": (filtered_df["outboundQty"] > 0),
-    "촬영": (filtered_df["__shot_done"] == 1),
-    "등록": (filtered_df["isRegistered"] == 1),
-    "판매개시": (
-        (pd.to_numeric(filtered_df["salesQty"], errors="coerce").fillna(0) > 0)
-        | (filtered_df["isOnSale"] == 1)
-        | (filtered_df["isRegistered"] == 1)
-    ),
-}
-flow_counts = pd.Series({
-    flow: filtered_df.loc[cond]["styleCode"].nunique()
-    for flow, cond in _flow_conditions.items()
-})
-
-# 흐름별 증감(delta) - 이전 기간 대비 비교용
+flow_types = FLOW_TYPES
+# 흐름별: 해당 조건을 만족하는 행이 하나라도 있는 스타일 수
+flow_counts = flow_counts_from_rollup(style_df)
+
+# 흐름별 증감(delta) - FLOW_DELTA_DAYS일 전 기록 대비, 같은 스타일들의 흐름 수 변화 (0이면 표시 안 함)
+history_dir = _flow_history_dir()
+baseline_day = flow_baseline_day(history_dir, FLOW_DELTA_DAYS) if history_dir else None
 deltas = None
+if baseline_day:
+    deltas = flow_deltas(_cached_flow_flags(history_dir, baseline_day), style_df, flow_counts)
 
 if "selected_flow" not in st.session_state:
     st.session_state.selected_flow = flow_types[0]
@@ -739,8 +582,8 @@ cols = st.columns(len(flow_types))
 for i, flow in enumerate(flow_types):
     is_selected = st.session_state.selected_flow == flow
     count = int(flow_counts.get(flow, 0))
-    delta_val = deltas.get(flow, 0) if deltas else None
-    delta_str = f"▲{delta_val}" if (delta_val is not None and delta_val > 0) else (str(delta_val) if delta_val is not None else "")
+    delta_val = deltas.get(flow) if deltas else None
+    delta_str = f"▲{delta_val}" if (delta_val is not None and delta_val > 0) else (f"▼{-delta_val}" if delta_val is not None else "")
     with cols[i]:
         btn_label = f"{flow}\n{count}/{total_n}"
         if delta_str:
@@ -756,78 +599,84 @@ for i, flow in enumerate(flow_types):
                 st.rerun()
 
 selected_flow = st.session_state.selected_flow
+if baseline_day:
+    st.caption(f"증감: {baseline_day} 기록 대비")
 
-# 상세 테이블: 필터된 전체 스타일 사용 (선택한 flow 조건으로만 자르지 않음)
-flow_df = filtered_df.copy()
+trend = flow_count_trend(_cached_flow_count_history(history_dir), brand, year, year_seasons) if history_dir else None
+if trend is not None and len(trend) > 1:
+    with st.expander("흐름 추이 (일별 스타일 수)", expanded=False):
+        st.line_chart(trend)
 
+# 상세 테이블: 필터된 전체 스타일 사용 (선택한 flow 조건으로만 자르지 않음)
 # 스타일 단위: styleCode 기준 집계 (수량 합산, 촬영/등록/판매개시는 하나라도 1이면 1)
-if len(flow_df) > 0:
-    group_cols = ["brand", "yearSeason", "styleCode"]
-    agg_dict = {
-        "inboundQty": "sum",
-        "outboundQty": "sum",
-        "stockQty": "sum",
-        "salesQty": "sum",
-        "isShot": "max",
-        "__shot_done": "max",
-        "isRegistered": "max",
-        "isOnSale": "max",
-    }
-    if "productName" in flow_df.columns:
-        agg_dict["productName"] = "first"
-    if "colorName" in flow_df.columns:
-        agg_dict["colorName"] = lambda s: " / ".join(s.dropna().astype(str).unique()[:5])
-    flow_df = flow_df.groupby(group_cols, dropna=False).agg(agg_dict).reset_index()
-
-flow_df["단계상태"] = flow_df.apply(compute_status, axis=1)
-flow_df["상태"] = flow_df["단계상태"]
-
-# 버튼별 정렬: 해당 단계가 안 된 스타일을 먼저
-order_list = FLOW_SORT_ORDER.get(
-    selected_flow,
-    list(BASE_SORT_ORDER.keys()),
-)
-order_map = {status: idx for idx, status in enumerate(order_list)}
-flow_df["_정렬키"] = flow_df["단계상태"].map(order_map).fillna(99)
-flow_df = flow_df.sort_values(by=["_정렬키", "styleCode"], ascending=[True, True])
-
-# 표시용 컬럼: 촬영 O/X, 등록 O/X (판매 열 제거)
-flow_df["_촬영"] = flow_df["__shot_done"].map(lambda x: "O" if (pd.notna(x) and int(x) == 1) else "X")
-flow_df["_등록"] = flow_df["isRegistered"].map(lambda x: "O" if (pd.notna(x) and x == 1) else "X")
+# 버튼별 정렬: 해당 단계가 안 된 스타일을 먼저 (_정렬키, styleCode). 전체 집계에서 꺼낸 경우 미리 계산한 순위 사용
+with timer.stage("sort", rows=len(style_df)):
+    if style_positions is not None:
+        flow_df = style_rollup.take(order_by_rank(style_positions, style_sort_ranks, selected_flow))
+    else:
+        flow_df = style_df.take(flow_sort_order(style_df, selected_flow))
 
 
 # 상세 테이블
 
 st.subheader(f"{selected_flow}의 상세현황")
 
-display_df = flow_df.copy()
-display_df.insert(0, "NO", range(1, len(display_df) + 1))
-show_cols = ["NO", "styleCode", "productName", "inboundQty", "outboundQty", "stockQty", "_촬영", "_등록", "상태"]
-show_cols = [c for c in show_cols if c in display_df.columns]
-display_df = display_df[show_cols]
-display_df = display_df.rename(columns={
-    "styleCode": "스타일코드",
-    "productName": "상품명",
-    "colorName": "컬러",
-    "inboundQty": "입고량",
-    "outboundQty": "출고량",
-    "stockQty": "재고량",
-    "_촬영": "촬영",
-    "_등록": "등록",
-})
-
-st.dataframe(display_df, use_container_width=True, hide_index=True)
-
-def to_excel(df):
-    output = BytesIO()
-    with pd.ExcelWriter(output) as writer:
-        df.to_excel(writer, index=False, sheet_name="상세현황")
-    return output.getvalue()
-
-excel_data = to_excel(display_df)
-st.download_button(
-    label="엑셀 다운로드하기",
-    data=excel_data,
-    file_name=f"상세현황_{selected_flow}.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+# 한 페이지(TABLE_PAGE_SIZE개)만 브라우저로 보냄. 필터가 바뀌어 페이지 수가 줄면 1페이지로
+page_count = max(1, -(-len(flow_df) // TABLE_PAGE_SIZE))
+if st.session_state.get("table_page", 1) > page_count:
+    st.session_state["table_page"] = 1
+page = 1
+if page_count > 1:
+    page = int(st.number_input("페이지", min_value=1, max_value=page_count, step=1, key="table_page"))
+page_start = (page - 1) * TABLE_PAGE_SIZE
+page_df = detail_table(flow_df.iloc[page_start:page_start + TABLE_PAGE_SIZE], start=page_start)
+
+with timer.stage("render_table", rows=len(page_df)):
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+if page_count > 1:
+    st.caption(f"전체 {len(flow_df)}개 중 {page_start + 1}–{page_start + len(page_df)}")
+
+# 다운로드: 버튼을 눌렀을 때만 파일 생성, (데이터 버전·필터·흐름·검색·형식)별로 캐시
+@st.cache_data(max_entries=16, show_spinner=False)
+def _cached_export(export_key, fmt, _df):
+    return export_table(_df, fmt)
+
+
+export_fmt = "xlsx"
+if len(flow_df) > EXPORT_FAST_PATH_ROWS:
+    export_fmt = st.radio(
+        "다운로드 형식",
+        list(EXPORT_FORMATS),
+        format_func=lambda f: EXPORT_FORMATS[f][0],
+        horizontal=True,
+        key="export_format",
+    )
+export_label, export_ext, export_mime = EXPORT_FORMATS[export_fmt]
+export_key = (
+    version_key if use_cache else id(items_df),
+    brand,
+    tuple(year_seasons),
+    selected_flow,
+    search,
+    export_fmt,
 )
+if st.session_state.get("export_key") != export_key:
+    if st.button(f"{export_label} 다운로드하기", key="export_prepare"):
+        st.session_state["export_key"] = export_key
+if st.session_state.get("export_key") == export_key:
+    with st.spinner("파일 생성 중..."), timer.stage("export", rows=len(flow_df), fmt=export_fmt) as rec:
+        export_data = _cached_export(export_key, export_fmt, detail_table(flow_df))
+        rec["bytes"] = len(export_data)
+    st.download_button(
+        label=f"{export_label} 파일 받기",
+        data=export_data,
+        file_name=f"상세현황_{selected_flow}.{export_ext}",
+        mime=export_mime,
+    )
+
+# 진단 패널 (관리자 전용: ?diag=<DIAGNOSTICS_TOKEN>)
+if show_diagnostics:
+    with st.expander("진단: 파이프라인 단계별 시간", expanded=False):
+        diag_df = pd.DataFrame(timer.records)
+        st.caption("prepare.*·index.*는 prepared_items의 하위 단계이며, 가공 결과 캐시 hit이면 기록되지 않음")
+        st.dataframe(diag_df, use_container_width=True, hide_index=True)
@@ -0,0 +1,90 @@
+"""대시보드 파이프라인 단계별 오프라인 벤치마크.
+
+실행 (저장소 루트에서):
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000
+
+가짜 gspread 클라이언트(benchmarks.synthetic)로 BASE·브랜드 시트를 만들고
+수집 → 컬럼 별칭 → 날짜 판정(BASE) → 숫자 변환 → 브랜드 병합(브랜드 시트 날짜 판정 포함) → 단계상태 → 스키마
+→ 필터 → 스타일 집계 → 내보내기 단계마다 걸린 시간과 결과 크기(행 수, 내보내기는 바이트)를 출력.
+가공 단계는 대시보드와 같은 prepare_items_df를 한 번 실행해 그 하위 단계 계측(StageTimer)을 그대로 씀.
+Google Sheets·Streamlit secrets 없이 동작.
+"""
+import argparse
+import time
+
+import pipeline
+from benchmarks.synthetic import build_fake_client
+
+
+def _timed(results, stage, fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    results.append((stage, time.perf_counter() - start, out))
+    return out
+
+
+def _size(obj):
+    if obj is None:
+        return 0
+    if isinstance(obj, int):
+        return obj
+    if isinstance(obj, tuple):
+        obj = obj[0]
+    if isinstance(obj, dict):
+        return sum(len(v) for v in obj.values() if v is not None and hasattr(v, "__len__"))
+    return len(obj) if hasattr(obj, "__len__") else 0
+
+
+def run_pipeline(client, ids, export_fmt="xlsx"):
+    """단계별 (단계명, 초, 결과) 목록 반환."""
+    results = []
+    brand_jobs = [(key, sid) for key, sid in ids.items() if key != "BASE"]
+
+    def _ingest():
+        base = pipeline.load_sheet_as_dataframe(client, ids["BASE"])
+        # 대시보드와 같이 브랜드 시트는 병합에 쓰는 컬럼만 읽음
+        brands = pipeline.load_sheets_concurrently(
+            brand_jobs, lambda sid: pipeline.load_sheet_columns_as_dataframe(client, sid)
+        )
+        return base, brands
+
+    raw_df, brand_frames = _timed(results, "ingest", _ingest)
+
+    timer = pipeline.StageTimer()
+    prepared, _ = pipeline.prepare_items_df(raw_df, brand_frames, timer=timer)
+    for rec in timer.records:
+        results.append((rec["stage"][len("prepare."):], rec["seconds"], rec.get("rows", 0)))
+
+    def _filter():
+        index = pipeline.build_partition_index(prepared)
+        brand = sorted(index)[0] if index else ""
+        year = next(iter(index.get(brand, {})), None)
+        return prepared.take(pipeline.select_partition_rows(index, brand, year))
+
+    _timed(results, "filter", _filter)
+    style_df = _timed(results, "rollup", pipeline.rollup_styles, prepared)
+
+    display_df = style_df[["styleCode", "productName", "inboundQty", "outboundQty", "stockQty", "단계상태"]]
+    _timed(results, "export", pipeline.export_table, display_df, export_fmt)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export", choices=sorted(pipeline.EXPORT_FORMATS), default="xlsx")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10}  {'stage':<12} {'seconds':>9}  {'out':>10}")
+    for n_rows in args.rows:
+        client, ids = build_fake_client(n_rows, seed=args.seed)
+        total = 0.0
+        for stage, seconds, out in run_pipeline(client, ids, export_fmt=args.export):
+            total += seconds
+            print(f"{n_rows:>10}  {stage:<12} {seconds:>9.3f}  {_size(out):>10}")
+        print(f"{n_rows:>10}  {'total':<12} {total:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
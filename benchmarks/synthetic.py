@@ -0,0 +1,170 @@
+"""오프라인 벤치마크용 가짜 시트 데이터와 gspread 대역.
+
+generate_base_rows / generate_brand_rows는 get_all_values()와 같은 형태(헤더 포함 문자열 2차원 리스트)를 만들고,
+FakeGspreadClient는 open_by_key·open·worksheet·sheet1·get_all_values·get_values·batch_get·lastUpdateTime만 흉내 냄.
+"""
+import random
+import re
+
+from pipeline import BRAND_CODE_MAP, BRAND_TO_SHEET, STYLE_CODE_SEASON_TO_YEAR
+
+BASE_HEADERS = [
+    "스타일코드(Now)",
+    "상품명",
+    "칼라(Now)",
+    "사이즈코드",
+    "년도(Now)",
+    "시즌(Now)",
+    "누적입고량(물류+입고조정+브랜드간)",
+    "출고량[출고-반품](매장+고객+샘플+브랜드간)",
+    "누적 판매량",
+    "판매재고량(입고량-누판량)",
+    "공홈등록일",
+]
+BRAND_HEADERS = ["스타일코드", "상품명", "리터칭 완료일", "공홈등록일"]
+
+COLORS = ["BLACK", "WHITE", "IVORY", "NAVY", "GREY", "BEIGE", "KHAKI", "PINK", "BLUE", "BROWN"]
+SIZES = ["XS", "S", "M", "L", "XL", "FREE", "230", "240", "250", "260"]
+# 실제 시트에 섞여 있는 날짜 표기: ISO, "2025. 1. 15", 엑셀 일련번호, 빈 값·미정 등
+DATE_CELLS = [
+    "2026-01-15", "2026-02-03", "2025-11-20",
+    "2026. 1. 15", "2026. 2. 3", "2025.12.1",
+    "46037", "46056",
+    "", "", "", "-", "미정", ".",
+]
+_ALNUM = "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
+
+
+def make_style_code(rng, brand_key):
+    """BRAND_CODE_MAP 접두어 + 연도 문자 + 시즌 숫자 규칙을 따르는 스타일코드 (미쏘는 한 칸 뒤)."""
+    year_char = rng.choice(list(STYLE_CODE_SEASON_TO_YEAR))
+    season = str(rng.randint(1, 4))
+    filler = "".join(rng.choice(_ALNUM) for _ in range(3 if brand_key == "mi" else 2))
+    tail = "".join(rng.choice(_ALNUM) for _ in range(4))
+    return f"{brand_key.upper()}{filler}{year_char}{season}{tail}"
+
+
+def generate_style_codes(n_styles, seed=0):
+    rng = random.Random(seed)
+    brand_keys = list(BRAND_CODE_MAP)
+    return [make_style_code(rng, rng.choice(brand_keys)) for _ in range(n_styles)]
+
+
+def _year_season(style_code):
+    offset = 5 if style_code[:2].lower() == "mi" else 4
+    year = STYLE_CODE_SEASON_TO_YEAR.get(style_code[offset], "")
+    return year, style_code[offset + 1]
+
+
+def generate_base_rows(n_rows, seed=0, skus_per_style=8):
+    """BASE 시트(get_all_values 형태). 스타일당 컬러×사이즈 SKU 여러 행."""
+    rng = random.Random(seed)
+    styles = generate_style_codes(max(1, n_rows // skus_per_style), seed=seed)
+    rows = [list(BASE_HEADERS)]
+    for i in range(n_rows):
+        code = styles[i // skus_per_style % len(styles)]
+        year, season = _year_season(code)
+        inbound = rng.choice([0, 0, 10, 20, 50, 120])
+        outbound = min(inbound, rng.choice([0, 0, 5, 10, 40]))
+        sales = min(outbound, rng.choice([0, 1, 3, 8]))
+        rows.append([
+            code,
+            f"상품 {code[-4:]}",
+            rng.choice(COLORS),
+            rng.choice(SIZES),
+            year,
+            season,
+            str(inbound),
+            str(outbound),
+            str(sales),
+            str(inbound - sales),
+            rng.choice(DATE_CELLS),
+        ])
+    return rows
+
+
+def generate_brand_rows(style_codes, brand_key, seed=0, duplicate_ratio=0.2):
+    """브랜드별 촬영·등록 시트. 해당 브랜드 스타일만, 일부 스타일은 여러 행(중복)."""
+    rng = random.Random(f"{seed}-{brand_key}")
+    rows = [list(BRAND_HEADERS)]
+    for code in style_codes:
+        if code[:2].lower() != brand_key:
+            continue
+        for _ in range(2 if rng.random() < duplicate_ratio else 1):
+            rows.append([code, f"상품 {code[-4:]}", rng.choice(DATE_CELLS), rng.choice(DATE_CELLS)])
+    return rows
+
+
+class FakeWorksheet:
+    def __init__(self, title, rows):
+        self.title = title
+        self._rows = rows
+
+    def get_all_values(self):
+        return [list(r) for r in self._rows]
+
+    def get_values(self, range_name):
+        """행 범위("1:3")만 지원."""
+        first, last = (int(x) for x in range_name.split(":"))
+        return [list(r) for r in self._rows[first - 1:last]]
+
+    def batch_get(self, ranges):
+        """한 열 범위("C2:C")만 지원. Sheets API처럼 빈 셀은 [], 끝의 빈 셀은 잘라서 돌려줌."""
+        out = []
+        for range_name in ranges:
+            letters, start = re.match(r"([A-Z]+)(\d+):", range_name).groups()
+            col = 0
+            for ch in letters:
+                col = col * 26 + ord(ch) - ord("A") + 1
+            cells = [r[col - 1] if col - 1 < len(r) else "" for r in self._rows[int(start) - 1:]]
+            while cells and cells[-1] == "":
+                cells.pop()
+            out.append([[c] if c != "" else [] for c in cells])
+        return out
+
+
+class FakeSpreadsheet:
+    def __init__(self, key, worksheets, last_update="2026-01-01T00:00:00.000Z"):
+        self.id = key
+        self._worksheets = worksheets
+        self.lastUpdateTime = last_update
+
+    @property
+    def sheet1(self):
+        return self._worksheets[0]
+
+    def worksheet(self, title):
+        for ws in self._worksheets:
+            if ws.title == title:
+                return ws
+        raise LookupError(title)
+
+
+class FakeGspreadClient:
+    """{spreadsheet_id: FakeSpreadsheet}를 들고 gspread.Client처럼 동작."""
+
+    def __init__(self, spreadsheets):
+        self.spreadsheets = dict(spreadsheets)
+
+    def open_by_key(self, key):
+        return self.spreadsheets[key]
+
+    def open(self, title):
+        for sh in self.spreadsheets.values():
+            if sh.id == title:
+                return sh
+        raise LookupError(title)
+
+
+def build_fake_client(n_rows, seed=0):
+    """BASE + 브랜드별 시트를 가진 가짜 클라이언트와 {라벨: spreadsheet_id} 반환."""
+    base_rows = generate_base_rows(n_rows, seed=seed)
+    style_codes = sorted({r[0] for r in base_rows[1:]})
+    sheets = {"base": FakeSpreadsheet("base", [FakeWorksheet("BASE", base_rows)])}
+    ids = {"BASE": "base"}
+    for sheet_key in BRAND_TO_SHEET.values():
+        key = sheet_key.lower()
+        sid = f"brand-{key}"
+        sheets[sid] = FakeSpreadsheet(sid, [FakeWorksheet(sheet_key, generate_brand_rows(style_codes, key, seed=seed))])
+        ids[sheet_key] = sid
+    return FakeGspreadClient(sheets), ids
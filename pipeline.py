@@ -0,0 +1,2002 @@
+"""브랜드 상품 흐름 대시보드 데이터 파이프라인.
+
+Streamlit 없이 import 가능: 시트 로딩·디스크 캐시, 컬럼 정리·촬영/등록 병합·단계상태,
+필터/검색 인덱스, 스타일 집계, 내보내기. 화면(app.py)과 벤치마크·배치 작업이 함께 사용.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from io import BytesIO
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# 단계별 계측 (벽시계 시간·행 수·RSS 변화·캐시 적중)
+def _current_rss_bytes():
+    """현재 프로세스 상주 메모리(바이트). /proc가 없는 환경에서는 None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _NullRecord(dict):
+    """계측이 꺼져 있을 때 stage()가 돌려주는 기록: 값을 넣어도 버림."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _NullStage:
+    _record = _NullRecord()
+
+    def __enter__(self):
+        return self._record
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("timer", "record", "start", "rss")
+
+    def __init__(self, timer, name, fields):
+        self.timer = timer
+        self.record = {"stage": name, **fields}
+
+    def __enter__(self):
+        self.rss = _current_rss_bytes()
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        rec = self.record
+        rec["seconds"] = round(time.perf_counter() - self.start, 4)
+        rss = _current_rss_bytes()
+        if rss is not None and self.rss is not None:
+            rec["mem_delta_mb"] = round((rss - self.rss) / 2**20, 2)
+        if exc_type is not None:
+            rec["error"] = exc_type.__name__
+        self.timer.records.append(rec)
+        logger.info("stage %s", json.dumps(rec, ensure_ascii=False, default=str))
+        return False
+
+
+class StageTimer:
+    """파이프라인 단계별 계측. `with timer.stage("이름") as rec:` 블록의 시간·RSS 변화를 기록하고
+    rec["rows"] 등 추가 필드를 받아 records에 쌓으며 JSON 로그 한 줄("stage {...}")로 남김.
+    enabled=False면 stage()가 공용 no-op 컨텍스트를 돌려주므로 비용이 거의 없음.
+
+    캐시 적중 판정: 캐시된 함수 본문에서 note_miss(key)를 부르고, 호출 측은 consume_miss(key)로
+    본문이 실제로 실행됐는지(miss) 확인."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.records = []
+        self._misses = set()
+
+    def stage(self, name, **fields):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, fields)
+
+    def note_miss(self, key):
+        if self.enabled:
+            self._misses.add(key)
+
+    def consume_miss(self, key):
+        if not self.enabled or key not in self._misses:
+            return False
+        self._misses.discard(key)
+        return True
+
+
+NULL_TIMER = StageTimer(enabled=False)
+
+
+def enable_stage_logging(level=logging.INFO):
+    """계측 로그("stage {...}")가 실제로 출력되도록 "pipeline" 로거에 level과 핸들러를 설정.
+    Streamlit처럼 logging을 설정하지 않는 환경용이며 여러 번 불러도 핸들러는 하나만 붙음."""
+    logger.setLevel(level)
+    if not any(getattr(h, "_pipeline_stage_log", False) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        handler._pipeline_stage_log = True
+        logger.addHandler(handler)
+        # 루트 로거에 핸들러가 있어도 같은 줄이 두 번 나오지 않도록
+        logger.propagate = False
+
+
+# Google Sheets 연동
+# 한 클라이언트를 여러 스레드가 함께 쓰므로 호스트당 유지할 keep-alive 연결 수를 동시 로딩 수보다 넉넉히
+SHEET_HTTP_POOL_SIZE = 16
+
+
+def get_gsheet_client(credentials_dict, pool_size=SHEET_HTTP_POOL_SIZE):
+    """서비스 계정 인증된 gspread 클라이언트. 클라이언트 안의 AuthorizedSession이 토큰을 만료 전까지 재사용하고
+    (만료 시 자동 갱신) HTTP 연결을 keep-alive로 유지하므로, 호출 측은 한 번 만들어 프로세스 전체에서 공유."""
+    if credentials_dict is None:
+        return None
+    import gspread
+    from google.oauth2.service_account import Credentials
+    scope = [
+        "https://www.googleapis.com/auth/spreadsheets",
+        "https://www.googleapis.com/auth/drive",
+    ]
+    creds = Credentials.from_service_account_info(
+        credentials_dict, scopes=scope
+    )
+    client = gspread.authorize(creds)
+    # gspread 6은 client.http_client.session, 5는 client.session
+    session = getattr(getattr(client, "http_client", None), "session", None) or getattr(client, "session", None)
+    if session is not None and pool_size:
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(pool_size))
+        session.mount("https://", adapter)
+    return client
+
+
+# Secrets 키 → 시트 라벨 (BASE + 브랜드별 촬영·등록 시트)
+SPREADSHEET_OPTIONS = {
+    "BASE_SPREADSHEET_ID": "BASE",
+    "SP_SPREADSHEET_ID": "SP",
+    "MI_SPREADSHEET_ID": "MI",
+    "CV_SPREADSHEET_ID": "CV",
+    "WH_SPREADSHEET_ID": "WH",
+    "RM_SPREADSHEET_ID": "RM",
+    "EB_SPREADSHEET_ID": "EB",
+    "HP_SPREADSHEET_ID": "HP",
+    "NK_SPREADSHEET_ID": "NK"
+}
+
+
+def spreadsheet_ids_from_config(config):
+    """Secrets(또는 같은 형태의 dict)에서 {라벨: spreadsheet_id} 추출."""
+    ids = {}
+    for secret_key, label in SPREADSHEET_OPTIONS.items():
+        try:
+            val = config.get(secret_key, "")
+            if val and str(val).strip():
+                ids[label] = str(val).strip()
+        except Exception:
+            pass
+    return ids
+
+
+def parse_header_row(raw):
+    """HEADER_ROW 설정값(1-based) → 0-based 헤더 행. 비어 있으면 0, "0"/auto/자동이면 -1(자동 감지)."""
+    if raw is None or str(raw).strip() == "":
+        return 0  # 1행이 헤더 (0-based)
+    if str(raw).strip().lower() in ("0", "auto", "자동"):
+        return -1  # 1~3행 중 '리터칭' 포함된 행 자동 선택
+    return int(raw) - 1  # 1-based → 0-based
+
+
+def parse_base_shards(value):
+    """BASE_SHARDS 설정 → ((spreadsheet_id, 워크시트명), ...).
+    값은 문자열 하나 또는 목록이고 각 항목은 "ID(또는 URL)" 또는 "ID|워크시트명" (워크시트 생략 시 첫 시트)."""
+    if value is None:
+        return ()
+    items = [value] if isinstance(value, str) else list(value)
+    shards = []
+    for item in items:
+        text = str(item).strip()
+        if not text:
+            continue
+        sid, _, sheet_name = text.partition("|")
+        shards.append((_normalize_spreadsheet_id(sid), sheet_name.strip()))
+    return tuple(shards)
+
+
+def concat_base_shards(frames):
+    """샤드별 BASE DataFrame 목록을 하나로 이어 붙임 (컬럼은 이름 기준 정렬, 없는 컬럼은 빈 값).
+    하나라도 읽지 못했으면 일부 데이터로 집계되지 않도록 None."""
+    if not frames or any(df is None for df in frames):
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    # 같은 이름 머릿글이 여러 개면 concat이 정렬할 수 없으므로 첫 번째만 남김
+    frames = [df.loc[:, ~df.columns.duplicated()] for df in frames]
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def _normalize_spreadsheet_id(spreadsheet_id_or_url):
+    import re
+
+    if spreadsheet_id_or_url is None:
+        return ""
+    s = str(spreadsheet_id_or_url).strip()
+    if not s:
+        return ""
+
+    m = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", s)
+    if m:
+        return m.group(1)
+
+    m = re.search(r"(?:^|[?&])key=([a-zA-Z0-9-_]+)", s)
+    if m:
+        return m.group(1)
+
+    return s
+
+def open_or_create_spreadsheet(client, spreadsheet_id=None, spreadsheet_title=None, create_if_missing=False):
+
+    sid = _normalize_spreadsheet_id(spreadsheet_id)
+    if sid:
+        return client.open_by_key(sid)
+
+    title = (spreadsheet_title or "").strip() if spreadsheet_title else ""
+    if not title:
+        raise ValueError("스프레드시트 ID/URL 또는 제목(spreadsheet_title)이 필요합니다.")
+
+    import gspread
+    try:
+        return client.open(title)
+    except gspread.exceptions.SpreadsheetNotFound:
+        if not create_if_missing:
+            raise
+        return client.create(title)
+
+
+# 시트 스냅샷 디스크 캐시: 재시작·재배포 후에도 마지막 정상 데이터를 바로 사용
+SHEET_CACHE_DIR = ".sheet_cache"
+SHEET_CACHE_TTL_SECONDS = 600
+
+
+def sheet_cache_key(spreadsheet_id, sheet_name, header_row):
+    import hashlib
+
+    raw = f"{spreadsheet_id}\x1f{sheet_name or ''}\x1f{int(header_row)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def projected_sheet_cache_dir(cache_dir, preferred_shot_date_col=None):
+    """컬럼만 읽은 브랜드 시트(load_sheet_columns_as_dataframe) 스냅샷 디렉터리.
+    고르는 촬영일 컬럼이 SHOT_DATE_COLUMN에 따라 달라지므로 설정값마다 따로 둠. 디스크 캐시를 끄면 ""."""
+    import hashlib
+
+    if not cache_dir:
+        return ""
+    tag = hashlib.sha1((preferred_shot_date_col or "").encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, "brand_columns", tag)
+
+
+def _sheet_cache_paths(cache_dir, key):
+    return os.path.join(cache_dir, f"{key}.parquet"), os.path.join(cache_dir, f"{key}.json")
+
+
+def read_sheet_meta(cache_dir, spreadsheet_id, sheet_name, header_row):
+    """디스크 스냅샷의 meta(dict)만 읽음. 없으면 None."""
+    if not cache_dir:
+        return None
+    _, meta_path = _sheet_cache_paths(cache_dir, sheet_cache_key(spreadsheet_id, sheet_name, header_row))
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def read_sheet_snapshot(cache_dir, spreadsheet_id, sheet_name, header_row):
+    """디스크에 저장된 시트 스냅샷 (DataFrame, meta) 반환. 없거나 읽을 수 없으면 (None, None)."""
+    meta = read_sheet_meta(cache_dir, spreadsheet_id, sheet_name, header_row)
+    if meta is None:
+        return None, None
+    data_path, _ = _sheet_cache_paths(cache_dir, sheet_cache_key(spreadsheet_id, sheet_name, header_row))
+    try:
+        df = pd.read_parquet(data_path)
+    except Exception:
+        return None, None
+    # 시트 머릿글은 중복·빈 값이 있을 수 있어 위치 기반 컬럼명으로 저장하고 원래 이름은 meta에 보관
+    df.columns = meta.get("columns", list(df.columns))
+    return df, meta
+
+
+def write_sheet_snapshot(cache_dir, spreadsheet_id, sheet_name, header_row, df, **extra_meta):
+    """시트 DataFrame을 Parquet + meta(json)로 원자적으로 저장. 실패해도 대시보드 동작에는 영향 없음."""
+    if not cache_dir or df is None or len(df.columns) == 0:
+        return None
+    data_path, meta_path = _sheet_cache_paths(cache_dir, sheet_cache_key(spreadsheet_id, sheet_name, header_row))
+    meta = {
+        "spreadsheet_id": spreadsheet_id,
+        "sheet_name": sheet_name or "",
+        "header_row": int(header_row),
+        "columns": [str(c) for c in df.columns],
+        "rows": int(len(df)),
+        "fetched_at": time.time(),
+        **extra_meta,
+    }
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        body = df.copy()
+        body.columns = [f"c{i}" for i in range(len(body.columns))]
+        body.to_parquet(data_path + ".tmp", index=False)
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+    except Exception:
+        return None
+    return meta
+
+
+def touch_sheet_snapshot(cache_dir, spreadsheet_id, sheet_name, header_row, **updates):
+    """데이터 파일은 그대로 두고 meta만 갱신 (변경 없음 확인 시 fetched_at 연장용)."""
+    if not cache_dir:
+        return None
+    _, meta_path = _sheet_cache_paths(cache_dir, sheet_cache_key(spreadsheet_id, sheet_name, header_row))
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        meta.update({"fetched_at": time.time(), **updates})
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+    except Exception:
+        return None
+    return meta
+
+
+# 시트 변경 여부 확인 (전체 다운로드 전 가벼운 메타데이터 조회)
+class GspreadRevisionProbe:
+    """스프레드시트의 Drive 수정 시각(modifiedTime)을 리비전 값으로 반환.
+    client는 open_by_key()가 lastUpdateTime(또는 get_lastUpdateTime())을 가진 객체를 돌려주면 되므로
+    로컬 가짜 클라이언트로 바꿔 끼울 수 있음."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def revision(self, spreadsheet_id):
+        """리비전 문자열. 확인할 수 없으면 None (이 경우 항상 새로 읽음)."""
+        try:
+            spreadsheet = self.client.open_by_key(_normalize_spreadsheet_id(spreadsheet_id))
+            getter = getattr(spreadsheet, "get_lastUpdateTime", None)
+            value = getter() if callable(getter) else getattr(spreadsheet, "lastUpdateTime", None)
+        except Exception:
+            return None
+        return str(value) if value else None
+
+
+def sheet_content_hash(df):
+    """리비전을 확인할 수 없을 때 쓰는 시트 내용 해시 (머릿글·셀 값·행 순서가 같으면 같은 값)."""
+    import hashlib
+
+    digest = hashlib.sha1("\x1f".join(str(c) for c in df.columns).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:24]
+
+
+def refresh_sheet_snapshot(client, spreadsheet_id, sheet_name, header_row, cache_dir, known_revision=None, probe=None, on_error=None, load_fn=None):
+    """시트를 새로 읽어 디스크 스냅샷을 갱신하고 (DataFrame|None, 변경여부, 리비전|None) 반환.
+    probe가 알려준 리비전이 known_revision과 같으면 get_all_values() 없이 fetched_at만 연장.
+    돌려준 리비전은 호출한 쪽이 메모리에 보관해 다음 호출의 known_revision으로 넘김 (디스크 캐시를 꺼도 동작).
+    load_fn은 load_sheet_as_dataframe과 같은 호출 형식의 로더 (기본: 전체 셀 읽기)."""
+    if client is None:
+        return None, False, known_revision
+    probe = probe if probe is not None else GspreadRevisionProbe(client)
+    revision = probe.revision(spreadsheet_id)
+    if revision and known_revision and revision == known_revision:
+        touch_sheet_snapshot(cache_dir, spreadsheet_id, sheet_name, header_row)
+        return None, False, revision
+    df = (load_fn or load_sheet_as_dataframe)(
+        client,
+        spreadsheet_id,
+        sheet_name=sheet_name or None,
+        header_row=header_row,
+        on_error=on_error,
+    )
+    if df is None:
+        return None, False, known_revision
+    write_sheet_snapshot(cache_dir, spreadsheet_id, sheet_name, header_row, df, revision=revision)
+    return df, True, revision
+
+
+_SheetEntry = namedtuple("_SheetEntry", ["df", "meta", "checked_at"])
+
+
+class SheetStore:
+    """(spreadsheet_id, 워크시트, header_row)별 시트 DataFrame을 프로세스 전체에서 공유하는 저장소.
+
+    - single-flight: 같은 키의 첫 로딩은 한 번만 실행되고, 동시에 요청한 쪽은 그 결과를 기다렸다 받음
+    - stale-while-revalidate: ttl이 지나도 이전 값을 바로 돌려주고 백그라운드에서 키당 하나만 갱신하며,
+      새 값은 항목 하나를 바꿔 끼우는 것으로 원자적으로 반영 (읽는 쪽은 이전/새 값 중 하나만 봄)
+
+    client_factory()는 gspread 클라이언트(또는 같은 인터페이스의 객체)를 돌려주면 됨.
+    loader를 주면 전체 셀 대신 그 로더로 읽음 (예: 필요한 컬럼만 읽는 load_sheet_columns_as_dataframe,
+    이때 cache_dir은 전체 시트 스냅샷과 따로 둠).
+    돌려주는 DataFrame은 여러 세션이 공유하므로 읽기 전용으로 사용."""
+
+    def __init__(self, client_factory, cache_dir=SHEET_CACHE_DIR, ttl=SHEET_CACHE_TTL_SECONDS, loader=None):
+        self._client_factory = client_factory
+        self._loader = loader
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = {}
+        self._refreshing = set()
+        self._prefetching = set()
+
+    @staticmethod
+    def _key(spreadsheet_id, sheet_name, header_row):
+        return (str(spreadsheet_id).strip(), sheet_name or "", int(header_row))
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, spreadsheet_id, sheet_name, header_row, on_error=None, timer=NULL_TIMER):
+        """시트 DataFrame (읽지 못하면 None, 실패는 저장하지 않아 다음 호출에서 다시 시도)."""
+        key = self._key(spreadsheet_id, sheet_name, header_row)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._key_lock(key):
+                entry = self._entries.get(key)
+                if entry is None:
+                    timer.note_miss(("load_sheet", spreadsheet_id, sheet_name, header_row))
+                    entry = self._load(key, on_error)
+                    if entry is None:
+                        return None
+                    self._entries[key] = entry
+        if time.time() - entry.checked_at >= self.ttl:
+            self._revalidate_in_background(key, entry)
+        return entry.df
+
+    def prefetch(self, sources):
+        """(spreadsheet_id, 워크시트, header_row) 중 아직 없는 것들을 백그라운드 스레드 하나에서 차례로 읽어 둠.
+        이미 읽었거나 다른 prefetch가 맡은 키는 건너뜀."""
+        with self._lock:
+            keys = [
+                key for key in (self._key(*source) for source in sources)
+                if key not in self._entries and key not in self._prefetching
+            ]
+            self._prefetching.update(keys)
+        if not keys:
+            return
+
+        def _run():
+            for key in keys:
+                try:
+                    self.get(*key)
+                except Exception as e:
+                    logger.warning("시트 미리 읽기 오류: %s", e)
+                finally:
+                    with self._lock:
+                        self._prefetching.discard(key)
+
+        threading.Thread(target=_run, name="sheet-prefetch", daemon=True).start()
+
+    def peek(self, spreadsheet_id, sheet_name, header_row):
+        """이미 읽어 둔 DataFrame. 없으면 None (읽기·갱신을 시작하지 않음)."""
+        entry = self._entries.get(self._key(spreadsheet_id, sheet_name, header_row))
+        return None if entry is None else entry.df
+
+    def version(self, spreadsheet_id, sheet_name, header_row):
+        """현재 값의 버전 토큰 (리비전 → 내용 해시 → 가져온 시각). 값이 없으면 ""."""
+        entry = self._entries.get(self._key(spreadsheet_id, sheet_name, header_row))
+        if entry is None:
+            return ""
+        meta = entry.meta
+        return str(meta.get("revision") or meta.get("content_hash") or meta.get("fetched_at", ""))
+
+    @staticmethod
+    def _entry(df, revision, fetched_at=None):
+        """메모리 항목: 리비전을 모르면 내용 해시를 버전으로 보관해 같은 내용을 다시 받아도 버전이 바뀌지 않게 함."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        meta = {"fetched_at": fetched_at}
+        if revision:
+            meta["revision"] = revision
+        else:
+            meta["content_hash"] = sheet_content_hash(df)
+        return _SheetEntry(df, meta, fetched_at)
+
+    def _load(self, key, on_error):
+        # 디스크 스냅샷이 있으면 그것부터 (스냅샷 시각 기준으로 오래됐으면 곧바로 백그라운드 갱신)
+        snapshot, meta = read_sheet_snapshot(self.cache_dir, *key)
+        if snapshot is not None:
+            return self._entry(snapshot, meta.get("revision"), float(meta.get("fetched_at", 0)))
+        df, _, revision = refresh_sheet_snapshot(
+            self._client_factory(), *key, self.cache_dir, on_error=on_error, load_fn=self._loader
+        )
+        if df is None:
+            return None
+        return self._entry(df, revision)
+
+    def _revalidate_in_background(self, key, entry):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _run():
+            try:
+                df, changed, revision = refresh_sheet_snapshot(
+                    self._client_factory(), *key, self.cache_dir,
+                    known_revision=entry.meta.get("revision"), load_fn=self._loader,
+                )
+                fresh = self._entry(df, revision) if changed and df is not None else None
+                if fresh is not None and (
+                    fresh.meta.get("content_hash") is None
+                    or fresh.meta["content_hash"] != entry.meta.get("content_hash")
+                ):
+                    self._entries[key] = fresh
+                else:
+                    # 변경 없음(리비전 같음·내용 해시 같음·일시 오류): 이전 값을 유지하고 다음 확인은 ttl 뒤로
+                    self._entries[key] = entry._replace(checked_at=time.time())
+            except Exception as e:
+                logger.warning("시트 갱신 오류: %s", e)
+                self._entries[key] = entry._replace(checked_at=time.time())
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_run, name=f"sheet-refresh-{sheet_cache_key(*key)}", daemon=True).start()
+
+
+# 브랜드 시트 동시 로딩 시 최대 동시 요청 수 (Sheets 읽기 쿼터 보호)
+SHEET_FETCH_WORKERS = 4
+
+
+def load_sheets_concurrently(jobs, load_fn, max_workers=SHEET_FETCH_WORKERS, initializer=None):
+    """(키, spreadsheet_id) 목록을 스레드 풀로 동시에 load_fn(spreadsheet_id) 호출해 {키: DataFrame|None} 반환.
+    전체 소요 시간이 시트별 합계가 아니라 가장 느린 시트 하나 수준이 되도록 함."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not jobs:
+        return {}
+
+    def _fetch(sid):
+        try:
+            # 문자열 ID는 공백 정리, (spreadsheet_id, 워크시트) 같은 묶음은 그대로 전달
+            return load_fn(sid.strip() if isinstance(sid, str) else sid)
+        except Exception:
+            return None
+
+    workers = max(1, min(int(max_workers), len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        frames = list(pool.map(_fetch, [sid for _, sid in jobs]))
+    return {key: df for (key, _), df in zip(jobs, frames)}
+
+
+def _detect_header_row(rows):
+    """자동 헤더 감지: 1행에 '리터칭'이 없으면 2행·3행 시도 (없으면 1행)."""
+    for try_row in range(min(3, len(rows))):
+        try_headers = [str(h).strip() for h in rows[try_row]]
+        if any("리터칭" in str(h) for h in try_headers):
+            return try_row
+    return 0
+
+
+def _open_worksheet(client, spreadsheet_id, sheet_name=None):
+    spreadsheet = open_or_create_spreadsheet(client, spreadsheet_id=spreadsheet_id)
+    if sheet_name and str(sheet_name).strip():
+        return spreadsheet.worksheet(str(sheet_name).strip())
+    return spreadsheet.sheet1
+
+
+def _column_letter(index):
+    """0-based 컬럼 위치 → A1 표기 열 문자 (0 → A, 26 → AA)."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def brand_sheet_columns(headers, preferred_shot_date_col=None):
+    """브랜드 시트 머릿글 중 촬영·등록 병합에 쓰는 컬럼(스타일코드·촬영일·등록일) 위치 목록.
+    병합 단계와 같은 컬럼 탐색 규칙(_find_photo_date_column·_find_registration_date_column)을 사용."""
+    header_df = pd.DataFrame(columns=headers)
+    style_col = "styleCode" if "styleCode" in headers else ("스타일코드" if "스타일코드" in headers else None)
+    wanted = []
+    for name in (
+        style_col,
+        _find_photo_date_column(header_df, preferred_name=preferred_shot_date_col),
+        _find_registration_date_column(header_df),
+    ):
+        if name is not None and name not in wanted:
+            wanted.append(name)
+    return [headers.index(name) for name in wanted]
+
+
+def load_sheet_columns_as_dataframe(
+    client,
+    spreadsheet_id=None,
+    sheet_name=None,
+    header_row=0,
+    on_error=None,
+    column_picker=brand_sheet_columns,
+    preferred_shot_date_col=None,
+):
+    """머릿글 행만 먼저 읽고 column_picker(머릿글)가 고른 컬럼만 batch_get으로 받아 DataFrame 생성.
+    전체 셀(get_all_values) 대비 응답 크기·JSON 해석·DataFrame 생성 비용이 고른 컬럼 수에 비례.
+    실패하면 load_sheet_as_dataframe과 같이 로그·on_error 후 None."""
+    try:
+        worksheet = _open_worksheet(client, spreadsheet_id, sheet_name)
+        head_rows = worksheet.get_values(f"1:{3 if header_row == -1 else header_row + 1}")
+        if header_row == -1:
+            header_row = _detect_header_row(head_rows)
+        if len(head_rows) <= header_row:
+            return pd.DataFrame()
+        headers = [str(h).strip() for h in head_rows[header_row]]
+        positions = column_picker(headers, preferred_shot_date_col)
+        if not positions:
+            return pd.DataFrame(columns=headers)
+        first_row = header_row + 2  # A1 표기는 1-based, 머릿글 다음 행부터
+        ranges = [f"{_column_letter(i)}{first_row}:{_column_letter(i)}" for i in positions]
+        columns = [[row[0] if row else "" for row in values] for values in worksheet.batch_get(ranges)]
+        # 열마다 끝의 빈 셀은 잘려서 오므로 가장 긴 열에 맞춰 채움
+        n_rows = max((len(cells) for cells in columns), default=0)
+        return pd.DataFrame({
+            headers[i]: cells + [""] * (n_rows - len(cells)) for i, cells in zip(positions, columns)
+        })
+    except Exception as e:
+        logger.warning("시트 읽기 오류: %s", e)
+        if on_error is not None:
+            on_error(f"시트 읽기 오류: {e}")
+        return None
+
+
+def load_sheet_as_dataframe(
+    client,
+    spreadsheet_id=None,
+    sheet_name=None,
+    header_row=0,
+    spreadsheet_title=None,
+    create_spreadsheet_if_missing=False,
+    create_worksheet_if_missing=False,
+    on_error=None,
+):
+    """시트를 DataFrame으로 읽음. 실패하면 로그를 남기고 on_error(메시지) 호출 후 None 반환."""
+    try:
+        spreadsheet = open_or_create_spreadsheet(
+            client,
+            spreadsheet_id=spreadsheet_id,
+            spreadsheet_title=spreadsheet_title,
+            create_if_missing=create_spreadsheet_if_missing,
+        )
+
+        # 워크시트는 반드시 "스프레드시트를 연 뒤"에 가져옵니다.
+        if sheet_name and str(sheet_name).strip():
+            try:
+                worksheet = spreadsheet.worksheet(str(sheet_name).strip())
+            except Exception as e:
+                # 없는 워크시트를 요청한 경우(옵션) 생성
+                if create_worksheet_if_missing:
+                    worksheet = spreadsheet.add_worksheet(title=str(sheet_name).strip(), rows=1000, cols=26)
+                else:
+                    raise e
+        else:
+            worksheet = spreadsheet.sheet1
+
+        rows = worksheet.get_all_values()
+        if not rows:
+            return pd.DataFrame()
+        if header_row == -1:
+            header_row = _detect_header_row(rows)
+        if len(rows) <= header_row:
+            return pd.DataFrame()
+        headers = [str(h).strip() for h in rows[header_row]]
+        # 헤더 위쪽 행을 제자리에서 지워 데이터 행 목록을 한 번 더 복사하지 않음
+        del rows[:header_row + 1]
+        return pd.DataFrame(rows, columns=headers)
+    except Exception as e:
+        logger.warning("시트 읽기 오류: %s", e)
+        if on_error is not None:
+            on_error(f"시트 읽기 오류: {e}")
+        return None
+
+# 스타일코드 앞 2자리 → 브랜드 한글명
+BRAND_CODE_MAP = {
+    "sp": "스파오",
+    "rm": "로엠",
+    "mi": "미쏘",
+    "wh": "후아유",
+    "nb": "뉴발란스",
+    "eb": "에블린",
+    "hp": "슈펜",
+    "cv": "클라비스",
+    "nk": "뉴발란스키즈"
+}
+# 브랜드별 촬영·등록 여부 시트 (해당 시트에서만 읽어서 merge)
+BRAND_TO_SHEET = {
+    "스파오": "SP",
+    "미쏘": "MI",
+    "클라비스": "CV",
+    "로엠": "RM",
+    "후아유": "WH",
+    "슈펜": "HP",  
+    "에블린": "EB", 
+    "뉴발란스키즈": "NK",
+    "뉴발란스": "NB"
+}
+
+def _normalize_style_code_for_merge(val):
+    if pd.isna(val):
+        return ""
+    s = str(val).strip()
+    if not s or s.lower() == "nan":
+        return ""
+    return "".join(s.split())
+
+
+def brand_from_style_code(style_code):
+    """스타일코드 앞 2자리로 브랜드명 반환 (소문자로 매핑)"""
+    if pd.isna(style_code) or not str(style_code).strip():
+        return ""
+    code = str(style_code).strip()[:2].lower()
+    return BRAND_CODE_MAP.get(code, code.upper())
+
+# 스타일코드 5번째 자리 → 연도, 6번째 자리 → 시즌
+STYLE_CODE_SEASON_TO_YEAR = {
+    "G": "2026",
+    "F": "2025",
+    "H": "2027",
+}
+
+def year_from_style_code(style_code, brand=None):
+    """스타일코드 미쏘만 6번째 자리가 연도, 그 외 브랜드는 5번째 자리가 연도."""
+    if pd.isna(style_code) or not str(style_code).strip():
+        return ""
+    s = str(style_code).strip()
+    if brand == "미쏘":
+        if len(s) < 6:
+            return ""
+        year_char = s[5].upper()
+    else:
+        if len(s) < 5:
+            return ""
+        year_char = s[4].upper()
+    return STYLE_CODE_SEASON_TO_YEAR.get(year_char, "")
+
+
+def year_season_from_style_code(style_code, brand=None):
+    """스타일코드에서 연도·시즌 자리로 '20261' 형태 반환. 미쏘만 6번째=연도·7번째=시즌, 그 외 5번째=연도·6번째=시즌."""
+    if pd.isna(style_code) or not str(style_code).strip():
+        return "", ""
+    s = str(style_code).strip()
+    if brand == "미쏘":
+        if len(s) < 7:
+            return "", ""
+        y = year_from_style_code(style_code, "미쏘")
+        if not y:
+            return "", ""
+        season_digit = s[6]
+    else:
+        if len(s) < 6:
+            return "", ""
+        y = year_from_style_code(style_code, brand)
+        if not y:
+            return "", ""
+        season_digit = s[5]
+    if not season_digit.isdigit():
+        return "", ""
+    ys = y + season_digit
+    return ys, f"{ys} 시즌 상품"
+
+
+def decode_style_codes(style_codes):
+    """스타일코드 컬럼 → brand, _year, _yearSeason 컬럼 DataFrame (행 인덱스 유지).
+    brand_from_style_code·year_from_style_code·year_season_from_style_code와 같은 규칙이며,
+    고유 스타일코드마다 한 번만 문자열 연산 후 행으로 펼침. 미쏘는 연도·시즌 자리가 한 칸 뒤."""
+    codes, uniques = pd.factorize(style_codes)
+    if len(uniques) == 0:
+        # 빈 컬럼·전부 빈 값: 문자열 연산 없이 빈 값으로 채움 (빈 Series의 str 연산은 dtype이 달라질 수 있음)
+        return pd.DataFrame("", index=style_codes.index, columns=["brand", "_year", "_yearSeason"], dtype=object)
+    s = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.strip()
+    empty = s == ""
+
+    prefix = s.str[:2].str.lower()
+    brand = prefix.map(BRAND_CODE_MAP).fillna(prefix.str.upper())
+    brand[empty] = ""
+
+    is_miso = (brand == "미쏘").to_numpy()
+    year_char = pd.Series(np.where(is_miso, s.str[5], s.str[4]), dtype=object)
+    year = year_char.str.upper().map(STYLE_CODE_SEASON_TO_YEAR).fillna("")
+
+    season_char = pd.Series(np.where(is_miso, s.str[6], s.str[5]), dtype=object)
+    has_season = season_char.str.isdigit().fillna(False).astype(bool) & (year != "")
+    year_season = (year + season_char.fillna("")).where(has_season, "")
+
+    decoded = pd.DataFrame({
+        "brand": brand.to_numpy(dtype=object),
+        "_year": year.to_numpy(dtype=object),
+        "_yearSeason": year_season.to_numpy(dtype=object),
+    })
+    # 빈 값(NaN) 스타일코드는 factorize 코드 -1 → 맨 끝에 붙인 빈 행을 가리키게 함
+    decoded.loc[len(decoded)] = ["", "", ""]
+    out = decoded.take(codes)
+    out.index = style_codes.index
+    return out
+
+# 시트 컬럼명 → 앱 필수 컬럼명 매핑 (한글/다른 표기 지원)
+COLUMN_ALIASES = {
+    "브랜드": "brand",
+    "연도시즌": "yearSeason",
+    "연도·시즌": "yearSeason",
+    "연도 시즌": "yearSeason",
+    "시즌(Now)": "yearSeason",
+    "스타일코드": "styleCode",
+    "스타일 코드": "styleCode",
+    "스타일코드(Now)": "styleCode",
+    "상품명": "productName",
+    "컬러코드": "colorCode",
+    "색상코드": "colorCode",
+    "컬러 코드": "colorCode",
+    "컬러명": "colorName",
+    "색상": "colorName",
+    "컬러 명": "colorName",
+    "칼라(Now)": "colorName",
+    "사이즈코드": "sizeCode",
+    "사이즈 코드": "sizeCode",
+    "입고수량": "inboundQty",
+    "출고수량": "outboundQty",
+    "재고수량": "stockQty",
+    "판매수량": "salesQty",
+    "누적입고량(물류+입고조정+브랜드간)": "inboundQty",
+    "출고량[출고-반품](매장+고객+샘플+브랜드간)": "outboundQty",
+    "누적 판매량": "salesQty",
+    "판매재고량(입고량-누판량)": "stockQty",
+    "리터칭 완료일": "isShot",
+    "리터칭완료일": "isShot",
+    "업로드완료일": "isShot",
+    "공홈등록일": "isRegistered",
+    "공홈 등록일": "isRegistered",
+}
+
+def ensure_year_season_from_columns(df):
+    """년도(Now) + 시즌(Now) → yearSeason 조합"""
+    if "yearSeason" in df.columns:
+        return df
+    if "년도(Now)" in df.columns and "시즌(Now)" in df.columns:
+        df = df.copy()
+        df["yearSeason"] = df["년도(Now)"].astype(str) + df["시즌(Now)"].astype(str)
+    return df
+
+def apply_column_aliases(df):
+    """컬럼명 앞뒤 공백 제거 후 알려진 별칭으로 매핑"""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df = ensure_year_season_from_columns(df)
+    rename = {}
+    for col in list(df.columns):
+        if col in COLUMN_ALIASES:
+            target = COLUMN_ALIASES[col]
+            # 이미 있는 컬럼으로 덮어쓰지 않음 (예: yearSeason은 년도+시즌으로 이미 채움)
+            if target not in df.columns or col == target:
+                rename[col] = target
+    return df.rename(columns=rename) if rename else df
+
+def fill_missing_required_columns(df, required_columns):
+    """없는 필수 컬럼을 기본값으로 채움 (시트 구조가 다를 때 대시보드만 동작하도록)"""
+    df = df.copy()
+    for col in required_columns:
+        if col not in df.columns:
+            if col in ("isShot", "isRegistered", "isOnSale"):
+                df[col] = 0
+            elif col in ("inboundQty", "outboundQty", "stockQty", "salesQty"):
+                df[col] = 0
+            else:
+                df[col] = ""
+    return df
+
+
+# 단계상태 판정 (단일 컬럼, flow와 무관)
+# - 가장 앞 단계에서 멈춘 곳 하나만 표시
+
+def compute_status(row):
+    if row["inboundQty"] == 0:
+        return "미입고"
+    if row["outboundQty"] == 0:
+        return "미출고"
+    if row["__shot_done"] == 0:
+        return "미촬영"
+    if row["isRegistered"] == 0:
+        return "미등록"
+    return "판매개시"
+
+
+# 단계상태 판정 단계표: 위에서부터 순서대로 (컬럼, 해당 컬럼이 0일 때 상태)
+# compute_status와 같은 규칙을 컬럼 단위로 계산하기 위한 선언적 정의
+STATUS_STAGES = [
+    ("inboundQty", "미입고"),
+    ("outboundQty", "미출고"),
+    ("__shot_done", "미촬영"),
+    ("isRegistered", "미등록"),
+]
+STATUS_DONE = "판매개시"
+STATUS_CATEGORIES = [status for _, status in STATUS_STAGES] + [STATUS_DONE]
+
+
+def compute_status_series(df):
+    """compute_status(row)와 같은 단계상태를 행 단위 apply 없이 계산해 category 시리즈로 반환."""
+    codes = np.full(len(df), len(STATUS_STAGES), dtype="int8")
+    # 뒤 단계부터 덮어써서 가장 앞에서 멈춘 단계가 남도록 함
+    for idx in range(len(STATUS_STAGES) - 1, -1, -1):
+        col, _ = STATUS_STAGES[idx]
+        codes[(df[col] == 0).to_numpy(dtype=bool)] = idx
+    status = pd.Categorical.from_codes(codes, categories=STATUS_CATEGORIES)
+    return pd.Series(status, index=df.index, name="단계상태")
+
+
+# 기본 화면 정렬 순서
+BASE_SORT_ORDER = {
+    "미입고": 0,
+    "미출고": 1,
+    "미촬영": 2,
+    "미등록": 3,
+    "판매개시": 4,
+}
+
+# 버튼 클릭 시: 해당 단계가 안 된 스타일을 제일 위로
+FLOW_SORT_ORDER = {
+    "입고": ["미입고", "미출고", "미촬영", "미등록", "판매개시"],
+    "출고": ["미출고", "미입고", "미촬영", "미등록", "판매개시"],
+    "촬영": ["미촬영", "미입고", "미출고", "미등록", "판매개시"],
+    "등록": ["미등록", "미입고", "미출고", "미촬영", "판매개시"],
+}
+
+
+def flow_sort_order(style_df, flow):
+    """상세 테이블 정렬 위치 배열: (_정렬키, styleCode) 오름차순.
+    _정렬키는 FLOW_SORT_ORDER[flow] 안의 단계상태 순서 (없는 흐름은 BASE_SORT_ORDER 순서)."""
+    order_list = FLOW_SORT_ORDER.get(flow, list(BASE_SORT_ORDER.keys()))
+    order_map = {status: idx for idx, status in enumerate(order_list)}
+    sort_key = style_df["단계상태"].astype(object).map(order_map).fillna(99).to_numpy()
+    code_rank, _ = pd.factorize(style_df["styleCode"].astype(str), sort=True)
+    return np.lexsort((code_rank, sort_key))
+
+
+def flow_sort_ranks(style_df):
+    """정렬 변형(FLOW_SORT_ORDER의 흐름 + 기본 None)마다 style_df 행의 정렬 순위를 미리 계산.
+    선택 범위 정렬은 order_by_rank로 순위만 비교하면 되므로 흐름 버튼을 바꿔도 다시 정렬하지 않음."""
+    ranks = {}
+    for flow in [None] + list(FLOW_SORT_ORDER):
+        order = flow_sort_order(style_df, flow)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        ranks[flow] = rank
+    return ranks
+
+
+def order_by_rank(positions, ranks, flow):
+    """style_df 위치 배열(positions)을 미리 계산한 흐름별 순위대로 정렬."""
+    rank = ranks.get(flow, ranks[None])
+    return positions[np.argsort(rank[positions], kind="stable")]
+
+
+# 촬영 완료 판정: 리터칭완료일·업로드완료일 등 날짜 컬럼
+
+# 규칙: "리터칭완료일" 또는 "업로드완료일" 열에 날짜 값이 있으면 그 행은 촬영 O. (클라비스는 업로드완료일 사용)
+
+def _normalize_col_name(name):
+    """컬럼명 비교용: 앞뒤 공백·제어문자 제거, 유니코드 정규화, 공백 통일."""
+    if name is None or not isinstance(name, str):
+        return ""
+    try:
+        s = unicodedata.normalize("NFKC", str(name))
+    except Exception:
+        s = str(name)
+    s = s.strip()
+    s = "".join(c for c in s if ord(c) >= 32 or c in "\t\n\r")
+    return s.replace(" ", "").replace("\u3000", "")
+
+def _find_photo_date_column(df, preferred_name=None):
+    """촬영완료를 판정할 컬럼. 리터칭완료일·업로드완료일 등."""
+    if preferred_name and str(preferred_name).strip():
+        name = str(preferred_name).strip()
+        for c in df.columns:
+            if str(c).strip() == name:
+                return c
+        name_norm = _normalize_col_name(name)
+        for c in df.columns:
+            if _normalize_col_name(c) == name_norm:
+                return c
+    # 1순위: 이름에 "리터칭"이 포함된 컬럼 (공백/특수문자 무관, 가장 관대하게)
+    for c in df.columns:
+        raw = str(c)
+        if "리터칭" in raw or "retouch" in raw.lower():
+            return c
+    # 2순위: 머릿글 "리터칭완료일" 정확히 (공백/제어문자만 정규화)
+    for c in df.columns:
+        if _normalize_col_name(c) == "리터칭완료일":
+            return c
+    return None
+
+
+def _find_registration_date_column(df):
+    """등록 여부 판정용 날짜 컬럼. 공홈등록일 우선."""
+    for c in df.columns:
+        raw = str(c).strip()
+        n = _normalize_col_name(c)
+        if "공홈등록" in n or "공홈 등록" in n or "공홈등록일" in n:
+            return c
+    return None
+
+
+def _map_unique_values(ser, values_fn):
+    """values_fn(고유값 Series)를 고유값마다 한 번만 계산해 원래 행 순서로 펼침.
+    날짜 컬럼은 행 수에 비해 고유값이 매우 적어 문자열 정리·파싱 비용이 고유값 수에 비례하게 됨."""
+    codes, uniques = pd.factorize(ser, use_na_sentinel=False)
+    values = values_fn(pd.Series(uniques))
+    out = values.take(codes)
+    out.index = ser.index
+    out.name = ser.name
+    return out
+
+
+def _parse_date_series(ser):
+    """날짜 셀 → datetime (실패 NaT). 같은 문자열은 한 번만 파싱."""
+    return _map_unique_values(ser, _parse_date_values)
+
+
+# 날짜 셀 판정: 빈 값·표기용 기호는 날짜 아님, 숫자만 있으면 엑셀/구글 시트 일련번호 범위인지 확인,
+# 나머지는 정해진 형식(format=)을 차례로 시도해 값마다 따로 판정 (한 컬럼에 여러 표기가 섞여 있음)
+DATE_SENTINELS = frozenset(("", "0", "0.0", "-", ".", "—", "미정", "n/a", "N/A", "nan", "None", "NaT"))
+DATE_FORMATS = ("ISO8601", "%Y.%m.%d", "%Y/%m/%d")
+
+
+def _parse_date_value(val):
+    """정해진 형식에 맞지 않는 값 하나를 따로 추론 (다른 값의 형식에 영향받지 않음). 실패하면 NaT."""
+    try:
+        ts = pd.to_datetime(val, errors="coerce")
+    except Exception:
+        return pd.NaT
+    if ts is None or pd.isna(ts):
+        return pd.NaT
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def _parse_date_values(ser):
+    """고유 날짜 셀 값 → datetime (실패 NaT).
+    pd.to_datetime(컬럼)은 첫 값으로 형식을 추론해 다른 표기를 모두 NaT로 만들므로 값마다 판정:
+    표기용 기호(DATE_SENTINELS) 제외 → 일련번호 범위 → DATE_FORMATS 차례로 → 남은 값은 하나씩 추론."""
+    s = ser.astype(str).str.strip()
+    # "2025. 1. 15" → "2025.1.15", 끝의 점 제거
+    compact = s.str.replace(r"\s*([.\-/])\s*", r"\1", regex=True).str.rstrip(".")
+    out = pd.Series(pd.NaT, index=ser.index, dtype="datetime64[ns]")
+    pending = (ser.notna() & ~s.isin(DATE_SENTINELS)).to_numpy(dtype=bool)
+
+    num = pd.to_numeric(s, errors="coerce")
+    serial = pending & (num > 10000).to_numpy() & (num < 1000000).to_numpy()
+    if serial.any():
+        out[serial] = pd.to_datetime(num[serial], unit="D", origin="1899-12-30")
+        pending &= ~serial
+    for fmt in DATE_FORMATS:
+        if not pending.any():
+            break
+        out[pending] = pd.to_datetime(compact[pending], format=fmt, errors="coerce")
+        pending &= out.isna().to_numpy()
+    if pending.any():
+        out[pending] = compact[pending].map(_parse_date_value)
+    return out
+
+def _looks_like_date_value(val):
+    """셀 값이 날짜처럼 보이면 True (파싱 실패해도 '값 있음'으로 촬영 완료 처리용)."""
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return False
+    s = str(val).strip()
+    if not s or s in ("-", ".", "미정", "n/a", "N/A", "—"):
+        return False
+    # 숫자 4자리 이상 + 구분자(-./) 있으면 날짜로 간주
+    if any(sep in s for sep in ("-", ".", "/")) and any(c.isdigit() for c in s):
+        return True
+    # 숫자만 있는 경우(엑셀 시리얼)
+    if s.isdigit() and 10000 <= int(s) <= 1000000:
+        return True
+    return False
+
+
+def compute_shot_done_series(df, preferred_date_column=None):
+    """촬영 완료 여부(0/1) 시리즈 생성.
+    리터칭완료일에 값(날짜)이 있으면 그 행은 촬영 완료(O).
+    리터칭완료일 컬럼이 없으면 촬영일자/포토촬영일 등 다른 날짜 컬럼, 없으면 isShot(0/1) 폴백.
+    """
+    date_col = _find_photo_date_column(df, preferred_name=preferred_date_column)
+    if date_col is not None and date_col in df.columns:
+        ser = _parse_date_series(df[date_col])
+        done = ser.notna().astype(int)
+        # 파싱은 실패했지만 값이 날짜 형태인 경우(공백/형식 이슈) O 처리
+        if (done == 0).any():
+            raw = df[date_col].astype(str).str.strip()
+            fallback = _map_unique_values(raw, lambda u: u.map(_looks_like_date_value)).astype(int)
+            done = done.where(done == 1, fallback)
+        return done
+
+    if "isShot" in df.columns:
+        return (pd.to_numeric(df["isShot"], errors="coerce").fillna(0).astype(int) == 1).astype(int)
+
+    return pd.Series([0] * len(df), index=df.index, dtype="int64")
+
+
+def _date_cell_to_01(ser):
+    """날짜 셀에 유효한 날짜(또는 엑셀 일련번호)가 있으면 1, 아니면 0. 같은 문자열은 한 번만 판정."""
+    return _map_unique_values(ser, _date_values_to_01)
+
+
+def _date_values_to_01(ser):
+    no_date = pd.to_numeric(ser, errors="coerce") == 0
+    return (_parse_date_values(ser).notna() & ~no_date).astype(int)
+
+
+NUMERIC_COLUMNS = [
+    "inboundQty", "outboundQty", "stockQty", "salesQty",
+    "isShot", "isRegistered", "isOnSale"
+]
+
+REQUIRED_COLUMNS = [
+    "brand", "yearSeason", "styleCode", "productName",
+    "colorCode", "colorName", "sizeCode",
+    "inboundQty", "outboundQty", "stockQty", "salesQty",
+    "isShot", "isRegistered", "isOnSale"
+]
+
+
+# items_df 메모리 스키마: 값 종류가 적은 문자열은 category, 0/1 플래그는 int8, 수량은 int32
+CATEGORY_COLUMNS = ["brand", "yearSeason", "_year", "colorName", "sizeCode", "단계상태"]
+FLAG_COLUMNS = ["isShot", "isRegistered", "isOnSale", "__shot_done"]
+QUANTITY_COLUMNS = ["inboundQty", "outboundQty", "stockQty", "salesQty"]
+
+
+def _downcast_int(ser, dtype):
+    """값이 dtype 범위 안에 있을 때만 정수 축소 (범위를 벗어나면 원래 타입 유지)."""
+    info = np.iinfo(dtype)
+    if len(ser) and (ser.min() < info.min or ser.max() > info.max):
+        return ser
+    return ser.astype(dtype)
+
+
+def apply_items_schema(df):
+    """가공이 끝난 items_df에 고정 스키마 적용 (세션별 필터 복사본 메모리·비교 비용 절감)."""
+    for col in FLAG_COLUMNS:
+        if col in df.columns:
+            df[col] = _downcast_int(df[col], "int8")
+    for col in QUANTITY_COLUMNS:
+        if col in df.columns:
+            df[col] = _downcast_int(df[col], "int32")
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+SHOT_BIT = 1
+REGISTERED_BIT = 2
+
+
+def _normalize_style_codes(ser):
+    """_normalize_style_code_for_merge를 고유값마다 한 번만 적용."""
+    return _map_unique_values(ser, lambda u: u.map(_normalize_style_code_for_merge))
+
+
+def build_shot_registration_index(brand_frames, preferred_shot_date_col=None):
+    """브랜드별 촬영·등록 시트 → (브랜드, 정규화 스타일코드)당 한 행인 조회표와 shot_date_column.
+    조회표 컬럼: brand, _styleCode, bits (SHOT_BIT | REGISTERED_BIT, 같은 스타일이 여러 행이면 OR)."""
+    shot_date_column = None
+    parts = []
+    for brand_name, sheet_key in BRAND_TO_SHEET.items():
+        b_df = (brand_frames or {}).get(sheet_key)
+        if b_df is None or len(b_df) == 0:
+            continue
+        try:
+            b_df = b_df.copy()
+            b_df.columns = [str(c).strip() for c in b_df.columns]
+            sc = "styleCode" if "styleCode" in b_df.columns else ("스타일코드" if "스타일코드" in b_df.columns else None)
+            if not sc:
+                continue
+            bits = np.zeros(len(b_df), dtype=np.uint8)
+            shot_col = _find_photo_date_column(b_df, preferred_name=preferred_shot_date_col)
+            if shot_col and shot_col in b_df.columns:
+                # 모든 브랜드 동일 처리
+                bits |= np.where(_date_cell_to_01(b_df[shot_col]).to_numpy() == 1, SHOT_BIT, 0).astype(np.uint8)
+            if shot_date_column is None:
+                shot_date_column = f"{sheet_key} 시트 · {shot_col}"
+            reg_col = _find_registration_date_column(b_df)
+            if reg_col and reg_col in b_df.columns:
+                bits |= np.where(_date_cell_to_01(b_df[reg_col]).to_numpy() == 1, REGISTERED_BIT, 0).astype(np.uint8)
+            parts.append(pd.DataFrame({
+                "brand": brand_name,
+                "_styleCode": _normalize_style_codes(b_df[sc]).to_numpy(),
+                "bits": bits,
+            }))
+        except Exception:
+            continue
+    if not parts:
+        return None, shot_date_column
+    lookup = pd.concat(parts, ignore_index=True)
+    lookup = lookup[lookup["_styleCode"] != ""]
+    if len(lookup) == 0:
+        return None, shot_date_column
+    # 비트 OR = 촬영·등록 비트 각각의 max
+    shot = (lookup["bits"] & SHOT_BIT).groupby([lookup["brand"], lookup["_styleCode"]], sort=False).max()
+    reg = (lookup["bits"] & REGISTERED_BIT).groupby([lookup["brand"], lookup["_styleCode"]], sort=False).max()
+    index = (shot | reg).astype(np.uint8).rename("bits").reset_index()
+    return index, shot_date_column
+
+
+def merge_brand_shot_registration(items_df, brand_frames=None, preferred_shot_date_col=None, report=None):
+    """브랜드별 촬영·등록 시트({시트키: DataFrame})에서 스타일별 촬영완료(__shot_done)·등록(isRegistered)을
+    items_df에 병합하고 (items_df, shot_date_column) 반환.
+
+    (브랜드, 스타일코드)로 중복 제거한 조회표를 만들어 items_df의 고유 스타일코드에 대해서만 찾아본 뒤
+    행으로 펼침 (items_df 크기의 병합 프레임을 만들지 않음). 같은 브랜드 시트에 있으면 그 값을, 없으면
+    다른 브랜드 시트 값을 OR로 합쳐 사용. 여러 브랜드 시트에 나오는 스타일코드(충돌)는 경고 로그로 남기고
+    report(dict)를 넘기면 report["collisions"]에 {스타일코드: [브랜드...]}를 담음.
+    브랜드 시트가 하나라도 읽혔으면 BASE의 isRegistered는 쓰지 않고 0에서 시작. 모두 읽지 못했으면(값이 전부 None)
+    일시적인 시트 오류로 전부 미등록이 되지 않도록 BASE 값을 그대로 둠."""
+    # 촬영·등록 여부: 브랜드별 시트(SP/MI/CV/RM/WH)에서만 읽어서 merge. BASE에서는 사용 안 함.
+    items_df["__shot_done"] = 0
+    if "isRegistered" not in items_df.columns:
+        items_df["isRegistered"] = 0
+    if not brand_frames or "styleCode" not in items_df.columns or "brand" not in items_df.columns:
+        return items_df, None
+    if any(df is not None for df in brand_frames.values()):
+        items_df["isRegistered"] = 0
+
+    index, shot_date_column = build_shot_registration_index(brand_frames, preferred_shot_date_col)
+    if index is None:
+        return items_df, shot_date_column
+
+    shared = index["_styleCode"].duplicated(keep=False).to_numpy()
+    collisions = index[shared].groupby("_styleCode", sort=False)["brand"].agg(list)
+    if len(collisions):
+        logger.warning(
+            "여러 브랜드 시트에 있는 스타일코드 %d개 (예: %s)",
+            len(collisions),
+            ", ".join(f"{code}={'/'.join(brands)}" for code, brands in collisions.head(5).items()),
+        )
+    if report is not None:
+        report["collisions"] = collisions.to_dict()
+
+    # 스타일코드 단위 조회: 브랜드 일치 → 스타일코드만 일치(여러 시트면 OR) → 0
+    codes, uniques = pd.factorize(items_df["styleCode"])
+    # 브랜드는 스타일코드에서 나오므로 스타일코드마다 아무 행 하나의 브랜드를 쓰면 됨
+    valid = codes >= 0
+    first_rows = np.zeros(len(uniques), dtype=np.int64)
+    first_rows[codes[valid]] = np.flatnonzero(valid)
+    unique_codes = pd.Series(uniques, dtype=object).map(_normalize_style_code_for_merge).to_numpy()
+    unique_brands = items_df["brand"].astype(object).to_numpy()[first_rows]
+
+    by_brand = pd.MultiIndex.from_frame(index[["brand", "_styleCode"]])
+    brand_pos = by_brand.get_indexer(pd.MultiIndex.from_arrays([unique_brands, unique_codes]))
+    by_code = (
+        (index["bits"] & SHOT_BIT).groupby(index["_styleCode"], sort=False).max()
+        | (index["bits"] & REGISTERED_BIT).groupby(index["_styleCode"], sort=False).max()
+    )
+    code_pos = by_code.index.get_indexer(unique_codes)
+    bits = np.where(
+        brand_pos >= 0,
+        index["bits"].to_numpy()[brand_pos],
+        np.where(code_pos >= 0, by_code.to_numpy()[code_pos], 0),
+    ).astype(np.uint8)
+
+    # 스타일코드가 비어 있는 행(codes == -1)은 0
+    row_bits = np.append(bits, np.uint8(0))[codes]
+    items_df["__shot_done"] = (row_bits & SHOT_BIT).astype(bool).astype(int)
+    items_df["isRegistered"] = (row_bits & REGISTERED_BIT).astype(bool).astype(int)
+    return items_df, shot_date_column
+
+
+def merge_brand_sheets_into_prepared(items_df, brand_frames, preferred_shot_date_col=None, report=None):
+    """brand_frames 없이 prepare_items_df로 만든 items_df(보통 한 브랜드의 행)에 브랜드 시트를 나중에 병합.
+    선택한 브랜드 시트만 먼저 읽는 지연 로딩용. 원본은 그대로 두고 (새 items_df, shot_date_column) 반환.
+    brand_frames에는 설정된 시트키를 모두 넣고 아직 읽지 않은 시트는 None으로 두면, 같은 brand_frames로 한 번에
+    병합한 prepare_items_df와 결과가 같음 (브랜드 시트가 없는 브랜드도 읽힌 다른 브랜드 시트로 보완)."""
+    items_df = items_df.copy()
+    items_df, shot_date_column = merge_brand_shot_registration(
+        items_df, brand_frames, preferred_shot_date_col, report=report
+    )
+    items_df["단계상태"] = compute_status_series(items_df)
+    return apply_items_schema(items_df), shot_date_column
+
+
+def prepare_items_df(items_df, brand_frames=None, preferred_shot_date_col=None, timer=NULL_TIMER):
+    """BASE 시트 원본 + 브랜드별 촬영·등록 시트({시트키: DataFrame}) → 대시보드용 items_df.
+    컬럼 별칭·날짜/숫자 변환·촬영/등록 병합·단계상태·연도까지 한 번에 수행하고
+    (items_df, shot_date_column) 반환. 결과는 여러 세션이 공유하므로 호출 측에서 수정하지 않음.
+    timer(StageTimer)를 넘기면 하위 단계별 시간을 기록."""
+    n_rows = len(items_df)
+    with timer.stage("prepare.aliases", rows=n_rows):
+        # 한글/다른 컬럼명을 필수 컬럼명으로 매핑
+        items_df = apply_column_aliases(items_df)
+
+        # 브랜드: 스타일코드(Now) 앞 2자리
+        # 스타일코드 → 브랜드·연도는 고유 스타일코드 단위로 한 번에 해석
+        style_info = decode_style_codes(items_df["styleCode"]) if "styleCode" in items_df.columns else None
+        if style_info is not None:
+            items_df["brand"] = style_info["brand"]
+
+    with timer.stage("prepare.date_parse", rows=n_rows):
+        if "isShot" in items_df.columns:
+            items_df["isShot"] = _date_cell_to_01(items_df["isShot"])
+        if "isRegistered" in items_df.columns:
+            items_df["isRegistered"] = _date_cell_to_01(items_df["isRegistered"])
+
+    with timer.stage("prepare.numeric", rows=n_rows):
+        for col in NUMERIC_COLUMNS:
+            if col in items_df.columns:
+                items_df[col] = pd.to_numeric(items_df[col], errors="coerce").fillna(0).astype(int)
+
+        missing = [col for col in REQUIRED_COLUMNS if col not in items_df.columns]
+        if missing:
+            items_df = fill_missing_required_columns(items_df, REQUIRED_COLUMNS)
+
+    with timer.stage("prepare.brand_merge", rows=n_rows) as rec:
+        merge_report = {}
+        items_df, shot_date_column = merge_brand_shot_registration(
+            items_df, brand_frames, preferred_shot_date_col, report=merge_report
+        )
+        rec["brand_rows"] = sum(len(df) for df in (brand_frames or {}).values() if df is not None)
+        rec["collisions"] = len(merge_report.get("collisions", ()))
+
+    with timer.stage("prepare.status", rows=n_rows):
+        # 단계상태 생성
+        items_df["단계상태"] = compute_status_series(items_df)
+
+    with timer.stage("prepare.schema", rows=n_rows):
+        # 연도·시즌: 시즌은 항상 시즌(Now) 열에서 사용. 연도(_year)만 스타일코드에서 보조 사용.
+        if style_info is None:
+            style_info = decode_style_codes(items_df["styleCode"])
+        items_df["_year"] = style_info["_year"]
+        empty_year = items_df["_year"] == ""
+        if empty_year.any():
+            items_df.loc[empty_year, "_year"] = items_df.loc[empty_year, "yearSeason"].astype(str).str[:4]
+        items_df = apply_items_schema(items_df)
+    return items_df, shot_date_column
+
+
+# 브랜드 → 연도 → 시즌 파티션 인덱스 (필터 비용을 선택한 행 수에 비례하게)
+def build_partition_index(items_df):
+    """{brand: {_year: {yearSeason: 행 위치 배열}}} 생성. 준비된 items_df와 함께 한 번만 만듦."""
+    index = {}
+    if len(items_df) == 0:
+        return index
+    groups = items_df.groupby(["brand", "_year", "yearSeason"], observed=True, dropna=False, sort=False).indices
+    for (brand, year, season), positions in groups.items():
+        index.setdefault(brand, {}).setdefault(year, {})[season] = positions
+    return index
+
+
+def select_partition_rows(index, brand, year=None, seasons=None):
+    """브랜드·연도·시즌 선택에 해당하는 행 위치 (원래 행 순서). seasons가 비어 있으면 전체 시즌."""
+    by_year = index.get(brand, {})
+    years = [year] if year is not None else list(by_year)
+    parts = []
+    for y in years:
+        by_season = by_year.get(y, {})
+        keys = seasons if seasons else list(by_season)
+        parts.extend(by_season[k] for k in keys if k in by_season)
+    if not parts:
+        return np.array([], dtype=np.intp)
+    return np.sort(np.concatenate(parts))
+
+
+def season_options_from_index(index, year):
+    """해당 연도에 존재하는 시즌 목록 (전체 브랜드 기준, 정렬)."""
+    return sorted({season for by_year in index.values() for season in by_year.get(year, {})})
+
+
+# 흐름 집계 카드 (스타일 수 기준: 해당 단계 1건이라도 있으면 스타일 포함)
+FLOW_TYPES = ["입고", "출고", "촬영", "등록", "판매개시"]
+STYLE_GROUP_COLUMNS = ["brand", "yearSeason", "styleCode"]
+
+
+def flow_row_flags(df):
+    """흐름별 조건을 행 단위 bool 배열로 계산 {흐름: ndarray}."""
+    registered = df["isRegistered"].to_numpy() == 1
+    return {
+        "입고": df["inboundQty"].to_numpy() > 0,
+        "출고": df["outboundQty"].to_numpy() > 0,
+        "촬영": df["__shot_done"].to_numpy() == 1,
+        "등록": registered,
+        "판매개시": (
+            (pd.to_numeric(df["salesQty"], errors="coerce").fillna(0).to_numpy() > 0)
+            | (df["isOnSale"].to_numpy() == 1)
+            | registered
+        ),
+    }
+
+
+def _first_distinct_joined(group_ids, n_groups, values, limit=5, sep=" / "):
+    """그룹별로 처음 나온 서로 다른 값(NaN 제외) limit개를 sep로 이어 붙인 object 배열.
+    그룹마다 Python 함수를 부르지 않고 (그룹, 값) 중복 제거 + 순번으로 계산."""
+    out = np.full(n_groups, "", dtype=object)
+    value_codes, uniques = pd.factorize(values)
+    valid = value_codes >= 0
+    if not valid.any():
+        return out
+    names = np.asarray([str(v) for v in uniques], dtype=object)
+    pairs = pd.DataFrame({"g": group_ids[valid], "v": value_codes[valid]}).drop_duplicates()
+    rank = pairs.groupby("g", sort=False).cumcount().to_numpy()
+    g = pairs["g"].to_numpy()
+    v = pairs["v"].to_numpy()
+    for r in range(limit):
+        at = rank == r
+        if not at.any():
+            break
+        out[g[at]] = names[v[at]] if r == 0 else out[g[at]] + sep + names[v[at]]
+    return out
+
+
+def rollup_styles(df):
+    """행(SKU) → 스타일(brand·yearSeason·styleCode) 단위 groupby 한 번으로
+    수량 합계·플래그 최대값·흐름별 포함 여부(_flow_입고 등)·단계상태를 함께 계산.
+    모든 집계가 내장 함수라 pandas의 빠른 경로를 타며, 컬러는 앞 5개 고유값을 따로 이어 붙임."""
+    agg_dict = {
+        "inboundQty": "sum",
+        "outboundQty": "sum",
+        "stockQty": "sum",
+        "salesQty": "sum",
+        "isShot": "max",
+        "__shot_done": "max",
+        "isRegistered": "max",
+        "isOnSale": "max",
+    }
+    if "productName" in df.columns:
+        agg_dict["productName"] = "first"
+    if "_year" in df.columns:
+        # _year는 스타일코드(없으면 yearSeason)에서 나오므로 스타일 안에서 항상 같음
+        agg_dict["_year"] = "first"
+    flags = {f"_flow_{flow}": cond.astype("int8") for flow, cond in flow_row_flags(df).items()}
+    for col in flags:
+        agg_dict[col] = "max"
+    work = df[STYLE_GROUP_COLUMNS + [c for c in agg_dict if c in df.columns]].assign(**flags)
+    # brand·yearSeason이 category이므로 실제 존재하는 조합만 집계 (observed=True)
+    grouped = work.groupby(STYLE_GROUP_COLUMNS, dropna=False, observed=True)
+    style_df = grouped.agg(agg_dict).reset_index()
+    if "colorName" in df.columns:
+        style_df["colorName"] = _first_distinct_joined(
+            grouped.ngroup().to_numpy(), len(style_df), df["colorName"]
+        )
+    style_df["단계상태"] = compute_status_series(style_df)
+    return style_df
+
+
+def flow_counts_from_rollup(style_df):
+    """스타일 집계에서 흐름별 스타일 수 (같은 스타일코드가 여러 시즌에 있어도 1개로 셈)."""
+    return pd.Series({
+        flow: style_df.loc[style_df[f"_flow_{flow}"] == 1, "styleCode"].nunique()
+        for flow in FLOW_TYPES
+    })
+
+
+# 전체 브랜드 개요: 브랜드 × 시즌별 스타일 수·흐름별 스타일 수
+OVERVIEW_TOTAL = "발주"
+
+
+def flow_overview(style_df, year=None):
+    """스타일 집계에서 (brand, yearSeason)별 스타일 수(발주)와 흐름별 스타일 수를 groupby 한 번으로 계산.
+    스타일 집계는 (brand, yearSeason, styleCode)당 한 행이므로 흐름별 수는 _flow_* 합계와 같음."""
+    if year is not None:
+        style_df = style_df[style_df["_year"] == year]
+    aggs = {OVERVIEW_TOTAL: ("styleCode", "size")}
+    aggs.update({flow: (f"_flow_{flow}", "sum") for flow in FLOW_TYPES})
+    return style_df.groupby(["brand", "yearSeason"], observed=True).agg(**aggs).astype("int64")
+
+
+def overview_matrix(overview, metric):
+    """flow_overview 결과에서 지표 하나를 브랜드(행) × 시즌(열) 표로 펼치고 전체 행·열을 붙임.
+    전체 열은 시즌 합계라 여러 시즌에 걸친 스타일은 시즌마다 셈."""
+    matrix = overview[metric].unstack("yearSeason", fill_value=0)
+    matrix.columns = matrix.columns.astype(str)
+    matrix.index = matrix.index.astype(str)
+    matrix["전체"] = matrix.sum(axis=1)
+    matrix.loc["전체"] = matrix.sum(axis=0)
+    return matrix
+
+
+# 스타일코드 검색 인덱스: 고유 스타일코드 3-gram 색인 + 최근 검색 결과 재사용
+class StyleSearchIndex:
+    """items_df 행별 스타일 번호(style_ids)와 고유 스타일코드 3-gram 색인.
+    search()는 부분 문자열(대소문자 무시)이 포함된 스타일 번호 배열을 반환하며,
+    직전 검색어를 포함하는 검색어는 직전 결과 안에서만 다시 확인함."""
+
+    GRAM = 3
+    RECENT_LIMIT = 64
+
+    def __init__(self, style_codes):
+        codes, uniques = pd.factorize(style_codes)
+        self.style_ids = codes.astype(np.int32)
+        self._codes = pd.Index(uniques)
+        self._lower = [str(c).lower() for c in uniques]
+        grams = {}
+        for style_id, code in enumerate(self._lower):
+            for i in range(len(code) - self.GRAM + 1):
+                grams.setdefault(code[i:i + self.GRAM], set()).add(style_id)
+        self._grams = {g: np.fromiter(ids, dtype=np.int32, count=len(ids)) for g, ids in grams.items()}
+        self._recent = {}
+
+    def _candidates(self, query):
+        # 직전 검색어가 이번 검색어에 포함되면 그 결과가 후보 (타이핑으로 검색어가 길어지는 경우)
+        best = None
+        for prev, ids in list(self._recent.items()):
+            if prev in query and (best is None or len(prev) > len(best[0])):
+                best = (prev, ids)
+        if best is not None:
+            return best[1]
+        if len(query) < self.GRAM:
+            return np.arange(len(self._lower), dtype=np.int32)
+        postings = []
+        for i in range(len(query) - self.GRAM + 1):
+            ids = self._grams.get(query[i:i + self.GRAM])
+            if ids is None:
+                return np.array([], dtype=np.int32)
+            postings.append(ids)
+        postings.sort(key=len)
+        found = postings[0]
+        for ids in postings[1:]:
+            found = np.intersect1d(found, ids, assume_unique=True)
+        return found
+
+    def ids_for(self, style_codes):
+        """스타일코드 → 스타일 번호 (색인에 없으면 -1)."""
+        return self._codes.get_indexer(style_codes).astype(np.int32)
+
+    def search(self, query):
+        """query가 포함된 스타일 번호 배열 (정렬됨)."""
+        query = str(query).lower()
+        if query in self._recent:
+            return self._recent[query]
+        lower = self._lower
+        found = np.array(
+            [i for i in self._candidates(query) if query in lower[i]], dtype=np.int32
+        )
+        found.sort()
+        if len(self._recent) >= self.RECENT_LIMIT:
+            self._recent.pop(next(iter(self._recent)), None)
+        self._recent[query] = found
+        return found
+
+
+def build_dashboard_data(items_df, shot_date_column=None, timer=NULL_TIMER, style_rollup=None):
+    """가공 완료된 items_df와 필터·검색용 인덱스, 전체 브랜드 스타일 집계 묶음.
+    세션 간 공유되므로 읽기 전용으로 사용. style_rollup을 넘기면(사전 계산 스냅샷) 집계를 건너뜀."""
+    with timer.stage("index.search", rows=len(items_df)):
+        search_index = StyleSearchIndex(items_df["styleCode"])
+    if style_rollup is None:
+        with timer.stage("index.rollup", rows=len(items_df)) as rec:
+            style_rollup = rollup_styles(items_df)
+            rec["styles"] = len(style_rollup)
+    with timer.stage("index.partitions", rows=len(items_df)):
+        data = {
+            "items_df": items_df,
+            "shot_date_column": shot_date_column,
+            "partition_index": build_partition_index(items_df),
+            "search_index": search_index,
+            "style_rollup": style_rollup,
+            "style_partition_index": build_partition_index(style_rollup),
+            "style_rollup_ids": search_index.ids_for(style_rollup["styleCode"]),
+        }
+    with timer.stage("index.sort_ranks", rows=len(style_rollup)):
+        data["style_sort_ranks"] = flow_sort_ranks(style_rollup)
+    return data
+
+
+# 사전 계산 스냅샷: 배치 작업(precompute.py)이 가공 결과를 버전별 디렉터리에 저장하고
+# 대시보드는 CURRENT가 가리키는 버전을 메모리 매핑으로 읽기만 함
+PREPARED_DIR = ".prepared"
+PREPARED_KEEP_VERSIONS = 3
+
+
+def prepared_version(source_revisions, settings):
+    """원본 시트 리비전({라벨: 리비전})과 가공 설정으로 만든 스냅샷 버전 문자열."""
+    import hashlib
+
+    raw = json.dumps({"sources": source_revisions, "settings": settings}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def current_prepared_version(prepared_dir):
+    """CURRENT 파일이 가리키는 버전. 없으면 None."""
+    if not prepared_dir:
+        return None
+    try:
+        with open(os.path.join(prepared_dir, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_prepared_meta(prepared_dir, version=None):
+    version = version or current_prepared_version(prepared_dir)
+    if not version:
+        return None
+    try:
+        with open(os.path.join(prepared_dir, version, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def write_prepared_snapshot(prepared_dir, version, items_df, style_rollup, shot_date_column=None, **extra_meta):
+    """items_df·스타일 집계를 <prepared_dir>/<version>/에 Parquet으로 쓰고 CURRENT를 원자적으로 교체.
+    meta.json에는 파티션(브랜드→연도→시즌별 행 수)과 원본 리비전 등을 기록. 오래된 버전은 정리."""
+    import shutil
+
+    target = os.path.join(prepared_dir, version)
+    staging = target + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    items_df.to_parquet(os.path.join(staging, "items.parquet"), index=False)
+    style_rollup.to_parquet(os.path.join(staging, "styles.parquet"), index=False)
+    partitions = {
+        brand: {year: {season: len(rows) for season, rows in seasons.items()} for year, seasons in years.items()}
+        for brand, years in build_partition_index(items_df).items()
+    }
+    meta = {
+        "version": version,
+        "created_at": time.time(),
+        "rows": int(len(items_df)),
+        "styles": int(len(style_rollup)),
+        "shot_date_column": shot_date_column,
+        "partitions": partitions,
+        **extra_meta,
+    }
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, default=str)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    current = os.path.join(prepared_dir, "CURRENT")
+    with open(current + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current + ".tmp", current)
+
+    versions = sorted(
+        (d for d in os.listdir(prepared_dir) if os.path.isfile(os.path.join(prepared_dir, d, "meta.json"))),
+        key=lambda d: os.path.getmtime(os.path.join(prepared_dir, d, "meta.json")),
+        reverse=True,
+    )
+    for old in versions[PREPARED_KEEP_VERSIONS:]:
+        if old != version:
+            shutil.rmtree(os.path.join(prepared_dir, old), ignore_errors=True)
+    return meta
+
+
+def read_prepared_snapshot(prepared_dir, version=None):
+    """(items_df, style_rollup, meta) 반환. 스냅샷이 없거나 읽을 수 없으면 (None, None, None).
+    Parquet은 메모리 매핑으로 읽어 시작 시간이 스냅샷 크기에 거의 비례하지 않도록 함."""
+    meta = read_prepared_meta(prepared_dir, version)
+    if meta is None:
+        return None, None, None
+    base = os.path.join(prepared_dir, meta["version"])
+    try:
+        items_df = pd.read_parquet(os.path.join(base, "items.parquet"), memory_map=True)
+        style_rollup = pd.read_parquet(os.path.join(base, "styles.parquet"), memory_map=True)
+    except Exception:
+        return None, None, None
+    return items_df, style_rollup, meta
+
+
+def precompute_prepared_snapshot(
+    client,
+    spreadsheet_ids,
+    prepared_dir=PREPARED_DIR,
+    header_row=0,
+    preferred_shot_date_col=None,
+    max_workers=SHEET_FETCH_WORKERS,
+    force=False,
+    timer=NULL_TIMER,
+    base_shards=(),
+    project_brand_columns=True,
+):
+    """Streamlit 없이 BASE·브랜드 시트를 읽어 가공·집계한 스냅샷을 저장하고 meta 반환.
+    spreadsheet_ids는 {"BASE": id, 시트키: id, ...}, base_shards(parse_base_shards 결과)가 있으면 BASE 대신 사용.
+    원본 리비전과 설정이 현재 스냅샷과 같으면 (force가 아니면) 시트를 다시 읽지 않고 기존 meta를 그대로 반환."""
+    base_shards = tuple(base_shards) or ((spreadsheet_ids.get("BASE"), ""),)
+    if not all(sid for sid, _ in base_shards):
+        raise ValueError("BASE 스프레드시트 ID가 필요합니다.")
+    brand_jobs = [
+        (sheet_key, spreadsheet_ids[sheet_key])
+        for sheet_key in BRAND_TO_SHEET.values()
+        if spreadsheet_ids.get(sheet_key)
+    ]
+    brand_header_row = int(header_row) if header_row >= 0 else 0
+    settings = {
+        "header_row": int(header_row),
+        "shot_date_column": preferred_shot_date_col,
+        "base_shards": [list(shard) for shard in base_shards],
+        "project_brand_columns": bool(project_brand_columns),
+    }
+
+    probe = GspreadRevisionProbe(client)
+    base_labels = [("BASE" if len(base_shards) == 1 else f"BASE{i}", sid) for i, (sid, _) in enumerate(base_shards)]
+    revisions = {label: probe.revision(sid) for label, sid in base_labels + brand_jobs}
+    # 리비전을 알 수 없는 시트가 있으면 매번 새로 계산
+    version = prepared_version(revisions, settings) if all(revisions.values()) else None
+    if version and not force and current_prepared_version(prepared_dir) == version:
+        meta = read_prepared_meta(prepared_dir, version)
+        if meta is not None:
+            return meta
+
+    def _on_error(message):
+        raise RuntimeError(message)
+
+    with timer.stage("fetch", sheet="BASE", shards=len(base_shards)) as rec:
+        shard_frames = load_sheets_concurrently(
+            list(enumerate(base_shards)),
+            lambda shard: load_sheet_as_dataframe(
+                client, shard[0], sheet_name=shard[1] or None, header_row=header_row, on_error=_on_error
+            ),
+            max_workers=max_workers,
+        )
+        raw_df = concat_base_shards([shard_frames[i] for i in range(len(base_shards))])
+        if raw_df is None:
+            raise RuntimeError("BASE 시트를 읽지 못했습니다.")
+        rec["rows"] = len(raw_df)
+    if len(raw_df) == 0:
+        raise RuntimeError("BASE 시트에 데이터가 없습니다.")
+    with timer.stage("fetch.brands") as rec:
+        if project_brand_columns:
+            # 브랜드 시트는 병합에 쓰는 컬럼(스타일코드·촬영일·등록일)만 읽음
+            def load_brand(sid):
+                return load_sheet_columns_as_dataframe(
+                    client, sid, header_row=brand_header_row, preferred_shot_date_col=preferred_shot_date_col
+                )
+        else:
+            def load_brand(sid):
+                return load_sheet_as_dataframe(client, sid, header_row=brand_header_row)
+        brand_frames = load_sheets_concurrently(brand_jobs, load_brand, max_workers=max_workers)
+        rec["rows"] = sum(len(df) for df in brand_frames.values() if df is not None)
+    items_df, shot_date_column = prepare_items_df(raw_df, brand_frames, preferred_shot_date_col, timer=timer)
+    with timer.stage("rollup", rows=len(items_df)):
+        style_rollup = rollup_styles(items_df)
+    with timer.stage("write", rows=len(items_df)):
+        return write_prepared_snapshot(
+            prepared_dir,
+            version or prepared_version(revisions, {**settings, "built_at": time.time()}),
+            items_df,
+            style_rollup,
+            shot_date_column,
+            source_revisions=revisions,
+            settings=settings,
+        )
+
+
+# 흐름 이력: 하루 두 파일(스타일별 흐름 포함 여부를 비트로 묶은 uint8, 파티션별 흐름 수).
+# 흐름 카드 증감은 기준일 파일 하나만 읽어 현재 스타일과 맞춰 보면 되므로 옛 시트를 다시 받을 필요 없음
+FLOW_HISTORY_DIR = ".flow_history"
+FLOW_DELTA_DAYS = 7
+# 이 일수보다 오래된 기록은 새로 기록할 때 삭제 (추이 차트 범위)
+FLOW_HISTORY_KEEP_DAYS = 90
+FLOW_BITS = {flow: 1 << i for i, flow in enumerate(FLOW_TYPES)}
+PARTITION_COLUMNS = ["brand", "_year", "yearSeason"]
+
+
+def pack_flow_flags(style_df):
+    """스타일 집계의 _flow_* 열 → 스타일별 uint8 비트 묶음 (비트 순서는 FLOW_TYPES)."""
+    packed = np.zeros(len(style_df), dtype=np.uint8)
+    for flow, bit in FLOW_BITS.items():
+        packed |= np.where(style_df[f"_flow_{flow}"].to_numpy() == 1, bit, 0).astype(np.uint8)
+    return packed
+
+
+def _flow_flags_path(history_dir, day):
+    return os.path.join(history_dir, f"flags-{day}.parquet")
+
+
+def _flow_counts_path(history_dir, day):
+    return os.path.join(history_dir, f"counts-{day}.parquet")
+
+
+def _history_file_days(history_dir, prefix):
+    try:
+        names = os.listdir(history_dir)
+    except OSError:
+        return []
+    return sorted(n[len(prefix):-len(".parquet")] for n in names if n.startswith(prefix) and n.endswith(".parquet"))
+
+
+def flow_history_days(history_dir):
+    """기록된 날짜(YYYY-MM-DD) 오름차순 목록."""
+    return _history_file_days(history_dir, "flags-")
+
+
+def prune_flow_history(history_dir, keep_days=FLOW_HISTORY_KEEP_DAYS, today=None):
+    """today - keep_days보다 오래된 날짜의 플래그·흐름 수 파일 삭제. 삭제한 날짜 수 반환."""
+    import datetime
+
+    today = today or datetime.date.today()
+    cutoff = (today - datetime.timedelta(days=keep_days)).isoformat()
+    removed = set()
+    for prefix, path_fn in (("flags-", _flow_flags_path), ("counts-", _flow_counts_path)):
+        for day in _history_file_days(history_dir, prefix):
+            if day < cutoff:
+                try:
+                    os.remove(path_fn(history_dir, day))
+                    removed.add(day)
+                except OSError:
+                    pass
+    return len(removed)
+
+
+def flow_baseline_day(history_dir, days_back=FLOW_DELTA_DAYS, today=None):
+    """증감 비교 기준일: today - days_back 이전(같은 날 포함) 기록 중 가장 최근. 없으면 None."""
+    import datetime
+
+    today = today or datetime.date.today()
+    cutoff = (today - datetime.timedelta(days=days_back)).isoformat()
+    earlier = [day for day in flow_history_days(history_dir) if day <= cutoff]
+    return earlier[-1] if earlier else None
+
+
+def _replace_brand_rows(previous, current, brands):
+    """같은 날 기록(previous)에서 brands의 행만 current로 바꿔 끼움."""
+    if previous is None or len(previous) == 0:
+        return current
+    keep = previous[~previous["brand"].astype(str).isin([str(b) for b in brands])]
+    keep = keep.astype({c: object for c in STYLE_GROUP_COLUMNS if c in keep.columns})
+    return pd.concat([keep, current], ignore_index=True)
+
+
+def record_flow_snapshot(history_dir, style_rollup, day=None, brands=None):
+    """오늘(day) 스타일별 흐름 플래그와 파티션별 흐름 수를 날짜별 파일로 기록 (같은 날 다시 부르면 덮어씀).
+    brands를 주면 style_rollup은 그 브랜드들만 담은 것으로 보고 같은 날 기록에서 해당 브랜드 행만 바꿈
+    (브랜드를 하나씩 병합하는 지연 로딩용). 이전 날짜 파일은 읽지 않으므로 기록 비용이 이력 길이와 무관하고,
+    FLOW_HISTORY_KEEP_DAYS보다 오래된 파일은 정리. 실패하면 None."""
+    import datetime
+
+    if not history_dir or style_rollup is None or len(style_rollup) == 0:
+        return None
+    day = day or datetime.date.today().isoformat()
+    try:
+        os.makedirs(history_dir, exist_ok=True)
+        flags = style_rollup[STYLE_GROUP_COLUMNS].astype(object)
+        flags["flags"] = pack_flow_flags(style_rollup)
+        if brands is not None:
+            flags = _replace_brand_rows(read_flow_flags(history_dir, day), flags, brands)
+        flags = flags.astype({c: "category" for c in STYLE_GROUP_COLUMNS})
+        path = _flow_flags_path(history_dir, day)
+        flags.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+
+        counts = (
+            style_rollup[PARTITION_COLUMNS + [f"_flow_{flow}" for flow in FLOW_TYPES]]
+            .groupby(PARTITION_COLUMNS, observed=True, dropna=False)
+            .sum()
+            .rename(columns=lambda c: c[len("_flow_"):])
+            .reset_index()
+        )
+        counts[PARTITION_COLUMNS] = counts[PARTITION_COLUMNS].astype(str)
+        counts.insert(0, "day", day)
+        counts_path = _flow_counts_path(history_dir, day)
+        if brands is not None:
+            previous = pd.read_parquet(counts_path) if os.path.exists(counts_path) else None
+            counts = _replace_brand_rows(previous, counts, brands)
+        counts.to_parquet(counts_path + ".tmp", index=False)
+        os.replace(counts_path + ".tmp", counts_path)
+        prune_flow_history(history_dir, today=datetime.date.fromisoformat(day))
+    except Exception as e:
+        logger.warning("흐름 이력 기록 오류: %s", e)
+        return None
+    return day
+
+
+def read_flow_flags(history_dir, day):
+    """기록된 날짜의 스타일별 플래그 DataFrame(brand, yearSeason, styleCode, flags). 없으면 None."""
+    try:
+        return pd.read_parquet(_flow_flags_path(history_dir, day))
+    except Exception:
+        return None
+
+
+def _style_keys(df):
+    return (
+        df["brand"].astype(str) + "\x1f" + df["yearSeason"].astype(str) + "\x1f" + df["styleCode"].astype(str)
+    ).to_numpy()
+
+
+def flow_deltas(baseline_flags, style_df, current_counts):
+    """현재 선택 범위(style_df)의 흐름별 스타일 수 - 같은 스타일들의 기준일 흐름별 스타일 수.
+    0이 아닌 흐름만 {흐름: 증감} 반환. 기준일에 없던 스타일은 기준일에 흐름이 없던 것으로 봄."""
+    if baseline_flags is None or len(baseline_flags) == 0 or len(style_df) == 0:
+        return {}
+    positions = pd.Index(_style_keys(baseline_flags)).get_indexer(_style_keys(style_df))
+    packed = np.where(positions >= 0, baseline_flags["flags"].to_numpy()[positions], 0)
+    codes = style_df["styleCode"].to_numpy()
+    deltas = {}
+    for flow, bit in FLOW_BITS.items():
+        before = pd.unique(codes[(packed & bit) != 0]).size
+        delta = int(current_counts.get(flow, 0)) - before
+        if delta:
+            deltas[flow] = delta
+    return deltas
+
+
+def read_flow_count_history(history_dir):
+    """날짜별 흐름 수 파일을 이어 붙인 일자·파티션별 누적표. 없으면 None."""
+    frames = []
+    for day in _history_file_days(history_dir, "counts-"):
+        try:
+            frames.append(pd.read_parquet(_flow_counts_path(history_dir, day)))
+        except Exception:
+            continue
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def flow_count_trend(count_history, brand, year=None, seasons=None):
+    """누적표에서 선택 범위의 일자 × 흐름 스타일 수 (추이 차트용).
+    파티션별 수를 더하므로 여러 시즌에 걸친 같은 스타일코드는 시즌마다 셈."""
+    if count_history is None or len(count_history) == 0:
+        return None
+    mask = count_history["brand"] == str(brand)
+    if year is not None:
+        mask &= count_history["_year"] == str(year)
+    if seasons:
+        mask &= count_history["yearSeason"].isin([str(s) for s in seasons])
+    trend = count_history.loc[mask].groupby("day")[FLOW_TYPES].sum()
+    return trend if len(trend) else None
+
+
+# 상세 테이블: 화면에는 한 페이지만 보내고, 전체 표는 다운로드할 때만 만듦
+TABLE_PAGE_SIZE = 100
+DETAIL_COLUMNS = {
+    "styleCode": "스타일코드",
+    "productName": "상품명",
+    "inboundQty": "입고량",
+    "outboundQty": "출고량",
+    "stockQty": "재고량",
+}
+
+
+def detail_table(flow_df, start=0):
+    """정렬된 스타일 집계(일부 구간 가능) → 표시용 표 (NO는 start+1부터, 촬영·등록 O/X, 상태)."""
+    out = pd.DataFrame({"NO": np.arange(start + 1, start + len(flow_df) + 1)})
+    for col, label in DETAIL_COLUMNS.items():
+        if col in flow_df.columns:
+            out[label] = flow_df[col].to_numpy()
+    out["촬영"] = np.where(flow_df["__shot_done"].to_numpy() == 1, "O", "X")
+    out["등록"] = np.where(flow_df["isRegistered"].to_numpy() == 1, "O", "X")
+    out["상태"] = flow_df["단계상태"].array
+    return out
+
+
+# 다운로드: 버튼을 눌렀을 때만 파일 생성, (데이터 버전·필터·흐름·검색·형식)별로 캐시
+EXPORT_FORMATS = {
+    "xlsx": ("엑셀", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV", "csv", "text/csv"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+# 이 행 수를 넘으면 CSV/Parquet 형식도 선택 가능
+EXPORT_FAST_PATH_ROWS = 20000
+
+
+def to_excel(df):
+    """xlsxwriter constant_memory 모드로 한 행씩 기록 (행 단위로 디스크에 흘려보내 메모리 사용 일정)."""
+    import xlsxwriter
+
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("상세현황")
+    worksheet.write_row(0, 0, [str(c) for c in df.columns])
+    body = df.astype(object).where(df.notna(), None)
+    for row_idx, row in enumerate(body.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_idx, 0, row)
+    workbook.close()
+    return output.getvalue()
+
+
+def export_table(df, fmt):
+    if fmt == "csv":
+        # 엑셀에서 한글이 깨지지 않도록 BOM 포함
+        return df.to_csv(index=False).encode("utf-8-sig")
+    if fmt == "parquet":
+        output = BytesIO()
+        df.to_parquet(output, index=False)
+        return output.getvalue()
+    return to_excel(df)
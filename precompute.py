@@ -0,0 +1,93 @@
+"""대시보드 데이터 사전 계산 배치 작업 (Streamlit 없이 실행).
+
+실행 (저장소 루트에서, 스케줄러에 등록해 주기적으로):
+    python precompute.py --secrets .streamlit/secrets.toml
+
+대시보드와 같은 secrets.toml(gcp_service_account, *_SPREADSHEET_ID, BASE_SHARDS, HEADER_ROW, SHOT_DATE_COLUMN,
+BRAND_SHEET_PROJECTION, PREPARED_DIR)을 읽어 BASE·브랜드 시트를 가공·집계한 스냅샷을 PREPARED_DIR/<버전>/에 쓰고 CURRENT를 교체.
+원본 시트 리비전이 바뀌지 않았으면 시트를 다시 읽지 않음 (--force로 강제).
+실행할 때마다 오늘 날짜의 스타일별 흐름 플래그를 FLOW_HISTORY_DIR에 기록 (흐름 카드 증감용).
+"""
+import argparse
+import logging
+import sys
+import tomllib
+
+from pipeline import (
+    FLOW_HISTORY_DIR,
+    PREPARED_DIR,
+    SHEET_FETCH_WORKERS,
+    NULL_TIMER,
+    StageTimer,
+    get_gsheet_client,
+    parse_base_shards,
+    parse_header_row,
+    precompute_prepared_snapshot,
+    read_prepared_snapshot,
+    record_flow_snapshot,
+    spreadsheet_ids_from_config,
+)
+
+
+def _credentials(config):
+    for key in ("gcp_service_account", "google_service_account"):
+        if key in config:
+            return dict(config[key])
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--out", default=None, help=f"스냅샷 디렉터리 (기본: PREPARED_DIR secret 또는 {PREPARED_DIR})")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="리비전이 같아도 다시 계산")
+    parser.add_argument("--trace", action="store_true", help="단계별 계측 로그 출력")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    with open(args.secrets, "rb") as f:
+        config = tomllib.load(f)
+
+    creds_dict = _credentials(config)
+    if creds_dict is None:
+        print("secrets에 gcp_service_account 또는 google_service_account가 없습니다.", file=sys.stderr)
+        return 2
+    spreadsheet_ids = spreadsheet_ids_from_config(config)
+    try:
+        workers = args.workers or int(config.get("SHEET_FETCH_WORKERS", SHEET_FETCH_WORKERS))
+    except Exception:
+        workers = SHEET_FETCH_WORKERS
+
+    prepared_dir = args.out or str(config.get("PREPARED_DIR", PREPARED_DIR) or PREPARED_DIR).strip()
+    try:
+        meta = precompute_prepared_snapshot(
+            get_gsheet_client(creds_dict),
+            spreadsheet_ids,
+            prepared_dir=prepared_dir,
+            header_row=parse_header_row(config.get("HEADER_ROW")),
+            preferred_shot_date_col=(config.get("SHOT_DATE_COLUMN") or "").strip() or None,
+            max_workers=workers,
+            force=args.force,
+            timer=StageTimer() if args.trace else NULL_TIMER,
+            base_shards=parse_base_shards(config.get("BASE_SHARDS")),
+            project_brand_columns=(
+                str(config.get("BRAND_SHEET_PROJECTION", "")).strip().lower() not in ("0", "false", "no", "n")
+            ),
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"사전 계산 실패: {e}", file=sys.stderr)
+        return 1
+    print(f"스냅샷 {meta['version']}: {meta['rows']}행, {meta['styles']}스타일")
+
+    history_dir = str(config.get("FLOW_HISTORY_DIR", FLOW_HISTORY_DIR) or "").strip()
+    if history_dir:
+        _, style_rollup, _ = read_prepared_snapshot(prepared_dir, meta["version"])
+        day = record_flow_snapshot(history_dir, style_rollup)
+        if day:
+            print(f"흐름 이력 {day} 기록")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
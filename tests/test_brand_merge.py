@@ -0,0 +1,69 @@
+"""지연 로딩(브랜드별 merge_brand_sheets_into_prepared)과 한 번에 병합(prepare_items_df)이 같은 결과인지 확인."""
+import pandas as pd
+
+from benchmarks.synthetic import generate_base_rows, generate_brand_rows
+from pipeline import (
+    BRAND_TO_SHEET,
+    build_partition_index,
+    merge_brand_sheets_into_prepared,
+    prepare_items_df,
+    select_partition_rows,
+)
+
+MERGED_COLUMNS = ["__shot_done", "isRegistered", "단계상태"]
+
+
+def _frame(rows):
+    return pd.DataFrame(rows[1:], columns=rows[0])
+
+
+def _sources(n_rows=2000, seed=3):
+    base_rows = generate_base_rows(n_rows, seed=seed)
+    raw_df = _frame(base_rows)
+    # BASE에도 등록일이 있지만 브랜드 시트가 설정돼 있으면 쓰지 않아야 함
+    raw_df["공홈등록일"] = "2026-01-15"
+    style_codes = sorted({r[0] for r in base_rows[1:]})
+    brand_frames = {
+        sheet_key: _frame(generate_brand_rows(style_codes, sheet_key.lower(), seed=seed))
+        for sheet_key in BRAND_TO_SHEET.values()
+        if sheet_key != "NB"  # 뉴발란스는 시트 없음 (NB_SPREADSHEET_ID 미설정)
+    }
+    # 뉴발란스 스타일 일부는 다른 브랜드(스파오) 시트에만 있음 → 다른 시트 값으로 보완
+    nb_codes = [code for code in style_codes if code.startswith("NB")][:5]
+    extra = pd.DataFrame({"스타일코드": nb_codes, "상품명": "", "리터칭 완료일": "2026-02-03", "공홈등록일": "2026-02-03"})
+    brand_frames["SP"] = pd.concat([brand_frames["SP"], extra], ignore_index=True)
+    return raw_df, brand_frames, nb_codes
+
+
+def _lazy_by_brand(raw_df, brand_frames):
+    base_df, _ = prepare_items_df(raw_df.copy(), None)
+    index = build_partition_index(base_df)
+    for brand in index:
+        positions = select_partition_rows(index, brand)
+        merged, _ = merge_brand_sheets_into_prepared(base_df.take(positions), brand_frames)
+        yield brand, positions, merged
+
+
+def test_lazy_merge_matches_eager_merge():
+    raw_df, brand_frames, nb_codes = _sources()
+    eager, _ = prepare_items_df(raw_df.copy(), brand_frames)
+    assert nb_codes and eager["styleCode"].isin(nb_codes).any()
+
+    for brand, positions, lazy in _lazy_by_brand(raw_df, brand_frames):
+        expected = eager.take(positions)
+        for col in MERGED_COLUMNS:
+            assert list(lazy[col].astype(object)) == list(expected[col].astype(object)), (brand, col)
+
+    nb = eager[eager["brand"] == "뉴발란스"]
+    assert set(nb.loc[nb["styleCode"].isin(nb_codes), "isRegistered"]) == {1}
+    assert set(nb.loc[~nb["styleCode"].isin(nb_codes), "isRegistered"]) <= {0}
+
+
+def test_no_loaded_brand_sheet_keeps_base_registration_in_both_modes():
+    raw_df, brand_frames, _ = _sources()
+    # 브랜드 시트를 하나도 읽지 못했으면(일시 오류·아직 미리 읽는 중) BASE 등록일을 그대로 씀
+    pending = {sheet_key: None for sheet_key in brand_frames}
+    eager, _ = prepare_items_df(raw_df.copy(), pending)
+    assert set(eager["isRegistered"]) == {1}
+    for brand, positions, lazy in _lazy_by_brand(raw_df, pending):
+        assert list(lazy["isRegistered"]) == list(eager["isRegistered"].take(positions)), brand
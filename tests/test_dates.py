@@ -0,0 +1,43 @@
+"""날짜 셀 판정: 한 컬럼에 여러 표기가 섞여 있어도 값마다 따로 판정하는지 확인."""
+import pandas as pd
+
+from pipeline import _date_cell_to_01, _parse_date_series
+
+MIXED = [
+    ("2026. 1. 15", 1),
+    ("2026-02-03", 1),
+    ("46037", 1),
+    ("", 0),
+    ("2025.12.1", 1),
+    ("-", 0),
+    ("미정", 0),
+    (".", 0),
+    ("0", 0),
+    ("2025/11/20", 1),
+    (" 2026-01-15 ", 1),
+    ("2026. 2. 3.", 1),
+    (None, 0),
+]
+
+
+def test_mixed_format_column_matches_values_alone():
+    cells = [cell for cell, _ in MIXED]
+    expected = [flag for _, flag in MIXED]
+    assert list(_date_cell_to_01(pd.Series(cells, dtype=object))) == expected
+    # 첫 값의 형식과 관계없이 같은 결과 (순서를 바꿔도, 값 하나씩 판정해도)
+    assert list(_date_cell_to_01(pd.Series(cells[::-1], dtype=object))) == expected[::-1]
+    for cell, flag in MIXED:
+        assert int(_date_cell_to_01(pd.Series([cell], dtype=object)).iloc[0]) == flag, cell
+
+
+def test_parsed_dates_and_row_order():
+    ser = pd.Series(["2026. 1. 15", "46037", "2026-01-15", "미정", "2026. 1. 15"], index=[5, 3, 9, 1, 7])
+    parsed = _parse_date_series(ser)
+    assert list(parsed.index) == [5, 3, 9, 1, 7]
+    assert parsed[5] == parsed[9] == parsed[7] == pd.Timestamp("2026-01-15")
+    assert parsed[3] == pd.Timestamp("1899-12-30") + pd.Timedelta(days=46037)
+    assert pd.isna(parsed[1])
+
+
+def test_empty_column():
+    assert len(_date_cell_to_01(pd.Series([], dtype=object))) == 0
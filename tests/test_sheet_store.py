@@ -0,0 +1,73 @@
+"""SheetStore 갱신: 디스크 캐시 없이도 리비전·내용 해시로 변경 없음을 알아내 버전을 유지하는지 확인."""
+import time
+
+from benchmarks.synthetic import FakeGspreadClient, FakeSpreadsheet, FakeWorksheet
+from pipeline import SheetStore
+
+ROWS = [["스타일코드", "리터칭 완료일"], ["RMAA51AAAA", "2026-01-15"], ["RMAA52BBBB", ""]]
+
+
+class CountingWorksheet(FakeWorksheet):
+    def __init__(self, title, rows):
+        super().__init__(title, rows)
+        self.full_fetches = 0
+
+    def get_all_values(self):
+        self.full_fetches += 1
+        return super().get_all_values()
+
+
+def _store(last_update):
+    worksheet = CountingWorksheet("RM", [list(r) for r in ROWS])
+    spreadsheet = FakeSpreadsheet("rm", [worksheet], last_update=last_update)
+    store = SheetStore(lambda: FakeGspreadClient({"rm": spreadsheet}), cache_dir="", ttl=3600)
+    return store, spreadsheet, worksheet
+
+
+def _tick(store):
+    """ttl이 지난 것처럼 get() 한 번으로 백그라운드 갱신을 시작하고 끝날 때까지 기다림."""
+    store.ttl = 0
+    store.get("rm", "", 0)
+    store.ttl = 3600
+    deadline = time.time() + 5
+    while store._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_unchanged_revision_skips_full_fetch_without_disk_cache():
+    store, _, worksheet = _store("2026-01-01T00:00:00.000Z")
+    first = store.get("rm", "", 0)
+    version = store.version("rm", "", 0)
+    for _ in range(4):
+        _tick(store)
+    assert worksheet.full_fetches == 1
+    assert store.version("rm", "", 0) == version
+    assert store.get("rm", "", 0) is first
+
+
+def test_changed_revision_swaps_in_new_data():
+    store, spreadsheet, worksheet = _store("2026-01-01T00:00:00.000Z")
+    store.get("rm", "", 0)
+    version = store.version("rm", "", 0)
+    worksheet._rows.append(["RMAA53CCCC", "2026-02-03"])
+    spreadsheet.lastUpdateTime = "2026-01-02T00:00:00.000Z"
+    _tick(store)
+    assert worksheet.full_fetches == 2
+    assert store.version("rm", "", 0) != version
+    assert len(store.get("rm", "", 0)) == 3
+
+
+def test_unknown_revision_falls_back_to_content_hash():
+    store, _, worksheet = _store(None)
+    first = store.get("rm", "", 0)
+    version = store.version("rm", "", 0)
+    for _ in range(3):
+        _tick(store)
+    # 리비전을 모르면 매번 다시 읽지만 내용이 같으면 버전·값은 그대로
+    assert worksheet.full_fetches == 4
+    assert store.version("rm", "", 0) == version
+    assert store.get("rm", "", 0) is first
+
+    worksheet._rows[1][1] = "2026-03-01"
+    _tick(store)
+    assert store.version("rm", "", 0) != version
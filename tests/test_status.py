@@ -0,0 +1,42 @@
+"""compute_status_series가 행 단위 compute_status와 같은 단계상태를 내는지 확인."""
+import itertools
+
+import pandas as pd
+import pandas.testing as tm
+
+from pipeline import STATUS_CATEGORIES, STATUS_STAGES, compute_status, compute_status_series
+
+STAGE_COLUMNS = [col for col, _ in STATUS_STAGES]
+
+
+def _status_frame():
+    # 네 단계 컬럼의 0/1 모든 조합 + 수량 컬럼은 1이 아닌 값(큰 수·소수)으로도
+    combos = list(itertools.product([0, 1], repeat=len(STAGE_COLUMNS)))
+    rows = [dict(zip(STAGE_COLUMNS, combo)) for combo in combos]
+    for inbound, outbound in [(120, 40), (0, 15), (7, 0), (2.5, 1)]:
+        for shot, registered in itertools.product([0, 1], repeat=2):
+            rows.append({"inboundQty": inbound, "outboundQty": outbound, "__shot_done": shot, "isRegistered": registered})
+    return pd.DataFrame(rows, columns=STAGE_COLUMNS, index=pd.RangeIndex(100, 100 + len(rows)))
+
+
+def test_matches_row_wise_compute_status():
+    df = _status_frame()
+    expected = df.apply(compute_status, axis=1)
+    result = compute_status_series(df)
+    tm.assert_series_equal(result.astype(object), expected.astype(object), check_names=False)
+    assert result.index.equals(df.index)
+
+
+def test_returns_ordered_stage_categories():
+    result = compute_status_series(_status_frame())
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert list(result.cat.categories) == STATUS_CATEGORIES
+    assert STATUS_CATEGORIES == ["미입고", "미출고", "미촬영", "미등록", "판매개시"]
+    assert result.name == "단계상태"
+
+
+def test_empty_frame():
+    df = pd.DataFrame({col: pd.Series(dtype="int64") for col in STAGE_COLUMNS})
+    result = compute_status_series(df)
+    assert len(result) == 0
+    assert list(result.cat.categories) == STATUS_CATEGORIES